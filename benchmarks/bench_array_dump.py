@@ -0,0 +1,61 @@
+'''
+Benchmark of the !nparray representer: time and peak memory to dump a large float array.
+
+Run from the repository root:
+python benchmarks/bench_array_dump.py [n_elements]
+
+Compares the text representer against the np.array2string based representer it replaced,
+    and against base64 encoding (!nparray_b64).
+'''
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from ruamel.yaml.comments import TaggedScalar
+
+from yaml_sci_config import yaml_interface
+from yaml_sci_config.load_save import yaml_dumps
+
+
+def _array2string_representer(dumper, data):
+    # the representer before the text was formatted in chunks, for comparison.
+    repr = 'np.array(' + np.array2string(data, max_line_width=np.inf, precision=16, separator=', ',
+                                         threshold=sys.maxsize) + ')'
+    repr = repr.replace(' ', '').replace(',', ', ')
+    return dumper.represent_tagged_scalar(TaggedScalar(repr, style=None, tag='!nparray'))
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(out)
+
+
+def dump_with(representer, data):
+    yaml = yaml_interface.yaml_preset
+    yaml.Representer.add_representer(np.ndarray, representer)
+    try:
+        return measure(lambda: yaml_dumps({'a': data}))
+    finally:
+        yaml.Representer.add_representer(np.ndarray, yaml_interface._array_representer)
+
+
+def dump_b64(data):
+    with yaml_interface.array_storage(yaml_interface.yaml_preset, b64_threshold=0):
+        return measure(lambda: yaml_dumps({'a': data}))
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    data = np.random.default_rng(0).normal(size=n)
+    print('{:>14} {:>10} {:>16} {:>14}'.format('representer', 'time (s)', 'peak memory (MB)', 'output (MB)'))
+    results = {'array2string': dump_with(_array2string_representer, data),
+               'chunked text': dump_with(yaml_interface._array_representer, data),
+               'base64': dump_b64(data)}
+    for name, (elapsed, peak, size) in results.items():
+        print('{:>14} {:>10.2f} {:>16.1f} {:>14.1f}'.format(name, elapsed, peak / 2**20, size / 2**20))
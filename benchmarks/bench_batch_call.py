@@ -0,0 +1,34 @@
+'''
+Benchmark of evaluating FunctionHandles over every point of a LinspaceParams grid,
+    with a Python loop against FunctionHandle.map_grid.
+
+Run from the repository root:
+python benchmarks/bench_batch_call.py
+'''
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from yaml_sci_config.interface_classes import FunctionHandle, LinspaceParams, PartialFunctionHandle
+
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    grid = LinspaceParams(lin_start=1, lin_stop=5, n_linspace=10**6)
+    handles = {'numpy.power(x, 2) (ufunc)': PartialFunctionHandle(module_name='numpy', function_name='power',
+                                                                   args=(2,)),
+               'math.gamma': FunctionHandle(module_name='math', function_name='gamma')}
+    print('{:>28} {:>10} {:>10} {:>14} {:>14}'.format('', 'loop (s)', 'map_grid', 'thread pool', 'process pool'))
+    with ThreadPoolExecutor(4) as threads, ProcessPoolExecutor(4) as processes:
+        for name, handle in handles.items():
+            times = [timed(lambda: np.array([handle(x) for x in grid.to_np_array()])),
+                     timed(lambda: handle.map_grid(grid)),
+                     timed(lambda: handle.map_grid(grid, vectorized=False, executor=threads, chunk_size=2**16)),
+                     timed(lambda: handle.map_grid(grid, vectorized=False, executor=processes, chunk_size=2**16))]
+            print('{:>28} {:>10.3f} {:>10.3f} {:>14.3f} {:>14.3f}'.format(name, *times))
@@ -0,0 +1,60 @@
+'''
+Time and memory per variant of a config built from one base config, with copy.deepcopy against
+    clone (copy-on-write), overriding two values per variant.
+
+Run from the repository root:
+python benchmarks/bench_clone.py
+'''
+import copy
+import time
+import tracemalloc
+
+import numpy as np
+
+from yaml_sci_config.clone import clone, freeze_arrays
+from yaml_sci_config.interface_classes import FunctionHandle, PartialFunctionHandle
+
+
+def make_base():
+    rng = np.random.default_rng(0)
+    return {
+        'mesh': {'nodes': rng.normal(size=(10**4, 3)), 'elements': rng.integers(0, 10**4, size=(2 * 10**4, 4))},
+        'materials': {'material_{}'.format(i): {'density': 7.8, 'modulus': 200e9, 'ratio': 0.3} for i in range(200)},
+        'outputs': [FunctionHandle.init_from_function_handle(np.mean) for _ in range(50)],
+        'filters': [PartialFunctionHandle.init_from_function_handle(np.sum, axis=i % 2) for i in range(50)],
+        'solver': {'tol': 1e-6, 'max_iter': 100, 'method': 'cg'},
+    }
+
+
+def variants(make_variant, n):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = [make_variant(i) for i in range(n)]
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed / n, size / n
+
+
+def deepcopy_variant(base):
+    def make_variant(i):
+        variant = copy.deepcopy(base)
+        variant['solver']['tol'] = 10.0**-i
+        variant['materials']['material_0']['density'] = 7.8 + i
+        return variant
+    return make_variant
+
+
+def clone_variant(base):
+    def make_variant(i):
+        return clone(base, {('solver', 'tol'): 10.0**-i, ('materials', 'material_0', 'density'): 7.8 + i})
+    return make_variant
+
+
+if __name__ == '__main__':
+    base = freeze_arrays(make_base())
+    print('{:>10} {:>10} {:>18} {:>18}'.format('', 'variants', 'time/variant (ms)', 'memory/variant (kB)'))
+    for name, make_variant, n in [('deepcopy', deepcopy_variant(base), 100), ('clone', clone_variant(base), 10**4)]:
+        elapsed, size = variants(make_variant, n)
+        print('{:>10} {:>10} {:>18.3f} {:>18.1f}'.format(name, n, elapsed * 1e3, size / 1e3))
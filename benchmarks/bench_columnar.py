@@ -0,0 +1,62 @@
+'''
+Load time and memory of a list of 10^5 yaml_dataclass records, loaded as objects and loaded as RecordColumns
+    (yaml_load_fname(..., columnar=True)), followed by getting the array of one field, as analysis code would.
+
+Run from the repository root:
+python benchmarks/bench_columnar.py
+'''
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from yaml_sci_config.load_save import yaml_load_fname, yaml_save_fname
+from yaml_sci_config.yaml_interface import yaml_dataclass
+
+
+@yaml_dataclass
+class Source:
+    x: float
+    y: float
+    amplitude: float
+    n_cycles: int
+
+
+def as_objects(fname):
+    sources = yaml_load_fname(fname, fast=True)['sources']
+    return sources, np.array([source.x for source in sources])
+
+
+def as_columns(fname):
+    sources = yaml_load_fname(fname, fast=True, columnar=True)['sources']
+    return sources, sources['x']
+
+
+def measure(load, fname, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(fname)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = load(fname)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return best, size
+
+
+if __name__ == '__main__':
+    n = 10**5
+    rng = np.random.default_rng(0)
+    sources = [Source(x=float(x), y=float(y), amplitude=1., n_cycles=int(c))
+               for x, y, c in zip(rng.normal(size=n), rng.normal(size=n), rng.integers(1, 10, size=n))]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fname = os.path.join(tmp_dir, 'sources.yaml')
+        yaml_save_fname({'sources': sources}, fname)
+        print('{:>10} {:>10} {:>14}'.format('', 'load (s)', 'memory (MB)'))
+        for name, load in [('objects', as_objects), ('columns', as_columns)]:
+            elapsed, size = measure(load, fname)
+            print('{:>10} {:>10.2f} {:>14.1f}'.format(name, elapsed, size / 1e6))
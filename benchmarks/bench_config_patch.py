@@ -0,0 +1,36 @@
+'''
+Time to write back a config after changing one key, dumping it whole with yaml_save_fname against ConfigPatch.write,
+    for configs of increasing size.
+
+Run from the repository root:
+python benchmarks/bench_config_patch.py
+
+The time of ConfigPatch.write should grow much more slowly than that of yaml_save_fname,
+    as only the changed entry is dumped again.
+'''
+import os
+import tempfile
+import timeit
+
+import numpy as np
+
+from yaml_sci_config.config_patch import ConfigPatch
+from yaml_sci_config.load_save import yaml_save_fname
+
+
+def make_config(n_sections):
+    return {'section_{}'.format(i): {'lr': 0.1 * i, 'shape': (i, i + 1), 'weights': np.arange(20) * i,
+                                     'name': 'run {}'.format(i)} for i in range(n_sections)}
+
+
+if __name__ == '__main__':
+    print('{:>10} {:>18} {:>18}'.format('sections', 'full dump (ms)', 'patch (ms)'))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_sections in [100, 1000, 10000]:
+            fname = os.path.join(tmp_dir, 'config_{}.yaml'.format(n_sections))
+            yaml_save_fname(make_config(n_sections), fname)
+            patch = ConfigPatch(fname)
+            patch.set(('section_0', 'lr'), 1e-3)
+            full = min(timeit.repeat(lambda: yaml_save_fname(patch.data, fname), number=1, repeat=3))
+            patched = min(timeit.repeat(patch.write, number=1, repeat=3))
+            print('{:>10} {:>18.2f} {:>18.2f}'.format(n_sections, full * 1e3, patched * 1e3))
@@ -0,0 +1,69 @@
+'''
+Benchmark of constructing configs with many small yaml_dataclass nodes, in nodes per second,
+    with the original dataclass constructor and with the one compiled per class by make_constructor.
+The document is parsed into nodes once, and only constructing objects from the nodes is timed,
+    as parsing takes the same time with either constructor.
+
+Run from the repository root:
+python benchmarks/bench_dataclass_load.py
+'''
+import time
+from dataclasses import _MISSING_TYPE, field, fields, is_dataclass
+
+from ruamel.yaml.constructor import RoundTripConstructor
+
+from yaml_sci_config.load_save import yaml_dumps
+from yaml_sci_config.yaml_interface import make_constructor, yaml_dataclass, yaml_fast, yaml_preset
+
+
+@yaml_dataclass
+class Segment:
+    start: float
+    stop: float
+    n_points: int = 10
+    tags: list = field(default_factory=list)
+
+    def __post_init__(self):
+        self.length = self.stop - self.start
+
+
+def old_make_constructor(cls):
+    def constructor(loader, node):
+        for data in RoundTripConstructor.construct_yaml_object(loader, node, cls):
+            yield data
+        if is_dataclass(cls):
+            for field in fields(cls):
+                try:
+                    getattr(data, field.name)
+                except AttributeError:
+                    if not isinstance(field.default_factory, _MISSING_TYPE):
+                        setattr(data, field.name, field.default_factory())
+                        continue
+                    raise (AttributeError(
+                        'Unset dataclass field for dataclass of type {}: {}'.format(type(data), field.name)))
+
+    return constructor
+
+
+def nodes_per_second(yaml, yaml_str, n_nodes, constructors, repeat=9):
+    '''
+    Best rate of each constructor over repeat runs, alternating between constructors to even out machine noise.
+    '''
+    node = yaml.compose(yaml_str)
+    best = [float('inf')] * len(constructors)
+    for _ in range(repeat):
+        for i, constructor in enumerate(constructors):
+            yaml.constructor.add_constructor('!Segment', constructor)
+            start = time.perf_counter()
+            yaml.constructor.construct_document(node)
+            best[i] = min(best[i], time.perf_counter() - start)
+    return [n_nodes / elapsed for elapsed in best]
+
+
+if __name__ == '__main__':
+    n_nodes = 10**4
+    yaml_str = yaml_dumps({'segments': [Segment(start=i, stop=i + 1.5) for i in range(n_nodes)]})
+    print('{:>10} {:>16} {:>16}'.format('loader', 'before (nodes/s)', 'after (nodes/s)'))
+    for name, yaml in [('rt', yaml_preset), ('fast', yaml_fast)]:
+        rates = nodes_per_second(yaml, yaml_str, n_nodes, [old_make_constructor(Segment), make_constructor(Segment)])
+        print('{:>10} {:>16.0f} {:>16.0f}'.format(name, *rates))
@@ -0,0 +1,55 @@
+'''
+Benchmark of the cold-start time to load a config naming functions in modules which are slow to import,
+    with FunctionHandles importing them on load (default) and on first use (deferred_imports).
+
+Run from the repository root:
+python benchmarks/bench_deferred_imports.py
+
+Each load runs in a fresh interpreter, so that no module is imported beforehand.
+'''
+import os
+import subprocess
+import sys
+import tempfile
+
+from yaml_sci_config.interface_classes import FunctionHandle
+from yaml_sci_config.load_save import yaml_dumps
+
+# standard library modules which numpy and yaml_sci_config don't import themselves.
+handles = {'fn_{}'.format(i): FunctionHandle(module_name=module_name, function_name=function_name)
+           for i, (module_name, function_name) in enumerate([('asyncio', 'run'), ('http.server', 'test'),
+                                                             ('unittest.mock', 'patch'), ('email.parser', 'Parser'),
+                                                             ('xml.dom.minidom', 'parseString'),
+                                                             ('multiprocessing.pool', 'Pool'),
+                                                             ('concurrent.futures', 'wait'),
+                                                             ('urllib.request', 'urlopen')])}
+
+load_script = '''
+import sys, time
+start = time.perf_counter()
+from yaml_sci_config.interface_classes import deferred_imports
+from yaml_sci_config.load_save import yaml_load_fname
+with deferred_imports({defer}):
+    yaml_load_fname(sys.argv[1])
+print(time.perf_counter() - start)
+'''
+
+
+def cold_load(fname, defer, repeat=5):
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', load_script.format(defer=defer), fname], check=True,
+                             capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=os.getcwd()))
+        times.append(float(out.stdout))
+    return min(times)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fname = os.path.join(tmp_dir, 'params.yaml')
+        with open(fname, 'w') as fout:
+            fout.write(yaml_dumps(handles))
+        eager, deferred = cold_load(fname, False), cold_load(fname, True)
+    print('{:>10} {:>16}'.format('', 'import + load (s)'))
+    print('{:>10} {:>16.3f}'.format('eager', eager))
+    print('{:>10} {:>16.3f}'.format('deferred', deferred))
@@ -0,0 +1,51 @@
+'''
+Benchmark of round-trip (yaml_preset) against fast (yaml_fast) loading, for small, medium and array-heavy configs.
+
+Run from the repository root:
+python benchmarks/bench_fast_load.py
+
+The fast loader uses the C based parser when ruamel.yaml.clib is installed, which makes the difference larger.
+'''
+import time
+
+import numpy as np
+
+import ruamel.yaml
+from yaml_sci_config.interface_classes import LogspaceParams, PartialFunctionHandle
+from yaml_sci_config.load_save import yaml_load, yaml_dumps
+
+
+def make_config(n_entries, array_size):
+    rng = np.random.default_rng(0)
+    config = {}
+    for i in range(n_entries):
+        config['entry_{}'.format(i)] = {
+            'name': 'entry {}'.format(i),
+            'scale': float(rng.normal()),
+            'shape': (i, i + 1),
+            'grid': LogspaceParams(log_start=-3, log_stop=i + 1, n_logspace=10),
+            'func': PartialFunctionHandle(module_name='numpy', function_name='sum', kwargs={'axis': -1}),
+        }
+        if array_size:
+            config['entry_{}'.format(i)]['data'] = rng.normal(size=array_size)
+    return yaml_dumps(config)
+
+
+def time_load(yaml_str, fast, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        yaml_load(yaml_str, fast=fast)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    configs = {'small': make_config(10, 0),
+               'medium': make_config(1000, 0),
+               'array-heavy': make_config(10, 10**4)}
+    print('C loader available: {}'.format(ruamel.yaml.__with_libyaml__))
+    print('{:>12} {:>10} {:>10} {:>10} {:>8}'.format('config', 'size (kB)', 'rt (s)', 'fast (s)', 'speedup'))
+    for name, yaml_str in configs.items():
+        rt, fast = time_load(yaml_str, fast=False), time_load(yaml_str, fast=True)
+        print('{:>12} {:>10.0f} {:>10.4f} {:>10.4f} {:>8.2f}'.format(name, len(yaml_str) / 1e3, rt, fast, rt / fast))
@@ -0,0 +1,50 @@
+'''
+Benchmark of loading many saved config files serially with yaml_load_fname, against load_many with a process pool,
+    with large arrays passed back through shared memory or pickled.
+
+Run from the repository root:
+python benchmarks/bench_load_many.py
+'''
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from yaml_sci_config.interface_classes import LogspaceParams, PartialFunctionHandle
+from yaml_sci_config.load_save import load_many, yaml_load_fname, yaml_save_fname
+
+
+def write_configs(out_dir, n_files, array_size):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(n_files):
+        config = {'run': i, 'lr': float(rng.uniform()), 'shape': (i, i + 1),
+                  'grid': LogspaceParams(log_start=-3, log_stop=1, n_logspace=10),
+                  'func': PartialFunctionHandle(module_name='numpy', function_name='sum', kwargs={'axis': -1}),
+                  'results': rng.normal(size=array_size)}
+        paths.append(os.path.join(out_dir, '{}_params.yaml'.format(i)))
+        yaml_save_fname(config, paths[-1], sidecar_threshold=10**4, b64_threshold=100)
+    return paths
+
+
+def timed(load, paths):
+    start = time.perf_counter()
+    load(paths)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    workers = os.cpu_count()
+    loads = {'serial': lambda paths: [yaml_load_fname(path) for path in paths],
+             'load_many': lambda paths: load_many(paths, workers=workers),
+             'load_many, pickled': lambda paths: load_many(paths, workers=workers, shared_threshold=float('inf'))}
+    print('{} workers'.format(workers))
+    print('{:>8} {:>12} '.format('files', 'array size') + ' '.join('{:>20}'.format(name) for name in loads))
+    with tempfile.TemporaryDirectory() as out_dir:
+        for n_files, array_size in [(1000, 10), (100, 10**6)]:
+            files_dir = os.path.join(out_dir, str(array_size))
+            os.mkdir(files_dir)
+            paths = write_configs(files_dir, n_files, array_size)
+            times = [timed(load, paths) for load in loads.values()]
+            print('{:>8} {:>12} '.format(n_files, array_size) + ' '.join('{:>18.3f} s'.format(t) for t in times))
@@ -0,0 +1,31 @@
+'''
+Microbenchmark of calling a PartialFunctionHandle, against calling a bare functools.partial of the same function.
+
+Run from the repository root:
+python benchmarks/bench_partial_call.py
+
+"before" is the original call path, which splats args and kwargs through FunctionHandle.__call__ on every call.
+'''
+import timeit
+from functools import partial
+
+from yaml_sci_config.interface_classes import FunctionHandle, PartialFunctionHandle
+
+
+def before_call(handle, *args, **kwds):
+    return FunctionHandle.__call__(handle, *args, *handle.args, **kwds, **handle.kwargs)
+
+
+if __name__ == '__main__':
+    number = 10**6
+    handle = PartialFunctionHandle(module_name='builtins', function_name='round', kwargs={'ndigits': 2})
+    bound = PartialFunctionHandle(module_name='builtins', function_name='round', kwargs={'ndigits': 2}).bind_args_first()
+    calls = {'bare partial': partial(round, ndigits=2),
+             'before': partial(before_call, handle),
+             'handle': handle,
+             'bind_args_first()': bound,
+             'to_function_handle()': handle.to_function_handle()}
+    print('{:>22} {:>14}'.format('', 'ns per call'))
+    for name, call in calls.items():
+        elapsed = min(timeit.repeat(lambda: call(1.23456), number=number, repeat=9))
+        print('{:>22} {:>14.0f}'.format(name, 1e9 * elapsed / number))
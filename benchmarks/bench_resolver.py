@@ -0,0 +1,82 @@
+'''
+Micro-benchmark of implicit tag resolution: the cost per plain scalar of deciding whether it is a
+    !tuple, !nparray, !complex or a standard YAML type, on a document with 100k scalars.
+
+Run from the repository root:
+python benchmarks/bench_resolver.py
+
+"before" uses the resolver patterns of the original release, registered with !complex tried on every scalar,
+    "after" uses the current patterns and the caching ScientificResolver.
+'''
+import random
+import re
+import time
+from types import SimpleNamespace
+
+from ruamel.yaml.nodes import ScalarNode
+from ruamel.yaml.resolver import VersionedResolver, implicit_resolvers
+
+from yaml_sci_config import yaml_interface
+
+
+def _old_complex_re():
+    num = r'(?:[+\-]?(?:\d*\.)?\d+)'
+    num_sci = r'(?:{num}(?:e[+\-]?\d+)?)'.format(num=num)
+    cx_num = r'(?:{num_sci}?{num_sci}[ij])'.format(num_sci=num_sci)
+    return r"^(?:{cx_num}|\({cx_num}\))$".format(cx_num=cx_num)
+
+
+old_patterns = [
+    ('!tuple', re.compile(r"^(?:\((?:.|\n|\r)*,(?:.|\n|\r)*\){1}(?: |\n|\r)*$)"), list('(')),
+    ('!nparray', re.compile(r"^(?:(np\.|)array\(\[(?:.|\n|\r)*,(?:.|\n|\r)*\]\){1}(?: |\n|\r)*$)"), list('an')),
+    ('!complex', re.compile(_old_complex_re()), [None]),
+]
+
+
+class OldResolver(VersionedResolver):
+    '''
+    The YAML 1.2 implicit resolvers, with the original custom patterns added.
+    Resolves like VersionedResolver.resolve, without growing the resolver lists in place as ruamel.yaml does.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        table = self._version_implicit_resolver.setdefault(self.processing_version, {})
+        resolvers = [(tag, regexp, first) for versions, tag, regexp, first in implicit_resolvers
+                     if (1, 2) in versions and not tag.startswith('!')] + old_patterns
+        for tag, regexp, first in resolvers:
+            for ch in first:
+                table.setdefault(ch, []).append((tag, regexp))
+
+    def resolve(self, kind, value, implicit):
+        table = self.versioned_resolver
+        for tag, regexp in table.get(value[0], []) + table.get(None, []):
+            if regexp.match(value):
+                return tag
+        return self.DEFAULT_SCALAR_TAG
+
+
+def make_scalars(n_scalars):
+    rng = random.Random(0)
+    kinds = [lambda i: str(i), lambda i: '{}.5e-3'.format(i), lambda i: 'name_{}'.format(i % 100),
+             lambda i: '({}, {})'.format(i, i + 1), lambda i: '{}+{}i'.format(i, i % 7),
+             lambda i: 'np.array([{}, 2, 3])'.format(i), lambda i: 'true', lambda i: '1' * 40 + 'x']
+    return [rng.choice(kinds)(i) for i in range(n_scalars)]
+
+
+def time_resolve(resolver, scalars):
+    start = time.perf_counter()
+    for value in scalars:
+        resolver.resolve(ScalarNode, value, (True, False))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    scalars = make_scalars(10**5)
+    # resolvers find the YAML version of the document being loaded through the scanner.
+    loading = SimpleNamespace(_scanner=SimpleNamespace(yaml_version=(1, 2)))
+    before = time_resolve(OldResolver(loadumper=loading), scalars)
+    after = time_resolve(yaml_interface.ScientificResolver(loadumper=loading), scalars)
+    print('{:>8} {:>16}'.format('', 'us per scalar'))
+    print('{:>8} {:>16.2f}'.format('before', 1e6 * before / len(scalars)))
+    print('{:>8} {:>16.2f}'.format('after', 1e6 * after / len(scalars)))
@@ -0,0 +1,55 @@
+'''
+Memory per instance of yaml_dataclass objects, with and without slots=True,
+    both for instances created directly and for instances loaded from yaml.
+
+Run from the repository root:
+python benchmarks/bench_slots_memory.py
+'''
+import tracemalloc
+
+from yaml_sci_config.load_save import yaml_dumps, yaml_load
+from yaml_sci_config.yaml_interface import yaml_dataclass
+
+
+@yaml_dataclass
+class Material:
+    density: float
+    youngs_modulus: float
+    poisson_ratio: float = 0.3
+    name: str = 'steel'
+
+
+@yaml_dataclass(slots=True)
+class SlottedMaterial:
+    density: float
+    youngs_modulus: float
+    poisson_ratio: float = 0.3
+    name: str = 'steel'
+
+
+def bytes_per_instance(make, n):
+    tracemalloc.start()
+    objects = make(n)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / n
+
+
+def created(cls):
+    return lambda n: [cls(density=7.8 + i, youngs_modulus=200e9) for i in range(n)]
+
+
+def loaded(cls, n):
+    yaml_str = yaml_dumps({'materials': created(cls)(n)})
+    return lambda n: yaml_load(yaml_str, fast=True)['materials']
+
+
+if __name__ == '__main__':
+    n = 10**4
+    print('{:>16} {:>12} {:>12}'.format('', 'dict (B)', 'slots (B)'))
+    print('{:>16} {:>12.0f} {:>12.0f}'.format(
+        'created', bytes_per_instance(created(Material), n), bytes_per_instance(created(SlottedMaterial), n)))
+    print('{:>16} {:>12.0f} {:>12.0f}'.format(
+        'loaded (fast)', bytes_per_instance(loaded(Material, n), n),
+        bytes_per_instance(loaded(SlottedMaterial, n), n)))
@@ -0,0 +1,51 @@
+'''
+Peak memory of processing a parameter sweep file, loading it whole with load_all against yaml_load_all_iter,
+    for sweeps of increasing length.
+
+Run from the repository root:
+python benchmarks/bench_stream.py
+
+The peak memory of yaml_load_all_iter should stay the same as the number of documents grows.
+'''
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from yaml_sci_config.interface_classes import LogspaceParams
+from yaml_sci_config.load_save import yaml_dump_stream, yaml_load_all_iter, yaml_preset
+
+
+def make_sweep(n_docs):
+    for i in range(n_docs):
+        yield {'run': i, 'lr': float(10.0**(-i % 5)), 'shape': (i, i + 1),
+               'grid': LogspaceParams(log_start=-3, log_stop=1, n_logspace=10), 'weights': np.arange(10) * i}
+
+
+def measure(process, fname):
+    tracemalloc.start()
+    process(fname)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def load_whole(fname):
+    with open(fname) as filep:
+        return sum(doc['run'] for doc in list(yaml_preset.load_all(filep)))
+
+
+def load_streamed(fname):
+    return sum(doc['run'] for doc in yaml_load_all_iter(fname))
+
+
+if __name__ == '__main__':
+    print('{:>8} {:>16} {:>16}'.format('docs', 'whole peak (MB)', 'stream peak (MB)'))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_docs in [250, 1000, 4000]:
+            fname = os.path.join(tmp_dir, 'sweep_{}.yaml'.format(n_docs))
+            with open(fname, 'w') as fout:
+                yaml_dump_stream(make_sweep(n_docs), fout)
+            whole_peak, stream_peak = measure(load_whole, fname), measure(load_streamed, fname)
+            print('{:>8} {:>16.2f} {:>16.2f}'.format(n_docs, whole_peak / 1e6, stream_peak / 1e6))
@@ -0,0 +1,42 @@
+'''
+Regression benchmark: loading time should grow linearly with the number of tagged scalars (!tuple, !nparray).
+
+Run from the repository root:
+python benchmarks/bench_tagged_scalars.py
+
+Prints the load time per scalar for documents of increasing size.
+If the time per scalar grows with the size of the document, load time has become super-linear.
+'''
+import time
+
+from yaml_sci_config.load_save import yaml_load
+
+
+def make_config(n_scalars):
+    lines = []
+    for i in range(n_scalars):
+        if i % 2:
+            lines.append('tuple_{}: ({}, {}.5, -{}e-3)'.format(i, i, i, i))
+        else:
+            lines.append('array_{}: np.array([{}, {}.5, 3])'.format(i, i, i))
+    return '\n'.join(lines) + '\n'
+
+
+def time_load(yaml_str, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        yaml_load(yaml_str)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    sizes = [1000, 2000, 4000, 8000]
+    times = [time_load(make_config(n)) for n in sizes]
+    print('{:>8} {:>10} {:>14}'.format('scalars', 'load (s)', 'us per scalar'))
+    for n, t in zip(sizes, times):
+        print('{:>8} {:>10.3f} {:>14.1f}'.format(n, t, 1e6 * t / n))
+    growth = (times[-1] / sizes[-1]) / (times[0] / sizes[0])
+    print('time per scalar grew by a factor {:.2f} between {} and {} scalars (1.0 is linear)'.format(
+        growth, sizes[0], sizes[-1]))
@@ -0,0 +1,175 @@
+'''
+Benchmark suite timing yaml_load, yaml_dumps and save_config, and measuring their peak memory,
+    on synthetic configs of different shapes:
+
+    deep: yaml_dataclass objects nested many levels deep.
+    scalars: many small !tuple and !complex scalars.
+    arrays: a few huge !nparray arrays.
+    handles: thousands of FunctionHandles and PartialFunctionHandles.
+
+Results are written to a json file, so that the results of two commits can be compared.
+
+Run from the repository root:
+python benchmarks/suite.py --out results.json
+python benchmarks/suite.py --compare base.json results.json --threshold 0.2
+
+--compare lists every time or peak memory which grew by more than the threshold (a fraction),
+    and exits with status 1 if there are any, so it can be used in CI.
+'''
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from yaml_sci_config.interface_classes import FunctionHandle, IOParams, PartialFunctionHandle, RunInfoParams
+from yaml_sci_config.load_save import save_config, yaml_dumps, yaml_load
+from yaml_sci_config.yaml_interface import yaml_dataclass
+
+
+@yaml_dataclass
+class Level:
+    depth: int
+    scale: float
+    shape: tuple
+    child: object = None
+
+
+def deep_config(scale):
+    levels = []
+    for branch in range(int(20 * scale)):
+        child = None
+        for depth in range(50):
+            child = Level(depth=depth, scale=0.5 * depth, shape=(depth, branch), child=child)
+        levels.append(child)
+    return {'levels': levels}
+
+
+def scalars_config(scale):
+    n = int(10**4 * scale)
+    return {'shapes': [(i, i + 1, i + 2) for i in range(n)], 'impedances': [complex(i, -0.5 * i) for i in range(n)]}
+
+
+def arrays_config(scale):
+    rng = np.random.default_rng(0)
+    n = int(10**5 * scale)
+    return {'field': rng.normal(size=n), 'mask': rng.integers(0, 2, size=n).astype(bool),
+            'spectrum': rng.normal(size=n // 4) + 1j * rng.normal(size=n // 4)}
+
+
+def handles_config(scale):
+    functions = [np.sum, np.mean, np.max, np.min]
+    n = int(2000 * scale)
+    return {'handles': [FunctionHandle.init_from_function_handle(functions[i % 4]) for i in range(n)],
+            'partials': [PartialFunctionHandle.init_from_function_handle(functions[i % 4], axis=i % 3)
+                         for i in range(n)]}
+
+
+CONFIGS = {'deep': deep_config, 'scalars': scalars_config, 'arrays': arrays_config, 'handles': handles_config}
+
+
+def measure(fn, repeat, setup=None):
+    '''
+    Returns the best time of repeat calls of fn, and the peak memory allocated during one more, traced, call.
+    If setup is given, each call is fn(setup()), with setup called outside of the timing and tracing,
+        so that every call does the same work.
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    args = () if setup is None else (setup(),)
+    tracemalloc.start()
+    try:
+        fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'time': best, 'peak_memory': peak}
+
+
+def run_suite(scale=1., repeat=3):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_info = RunInfoParams('suite.yaml')
+
+        def new_io_params():
+            # a new directory for each save, as sidecar files already in the directory are not written again.
+            return IOParams(out_dir=tempfile.mkdtemp(dir=tmp_dir), prefix='bench')
+
+        for name, make_config in CONFIGS.items():
+            config = make_config(scale)
+            yaml_str = yaml_dumps(config)
+            results[name] = {
+                'bytes': len(yaml_str),
+                'yaml_load': measure(lambda: yaml_load(yaml_str), repeat),
+                'yaml_dumps': measure(lambda: yaml_dumps(config), repeat),
+                'save_config': measure(lambda io_params: save_config(config, io_params, run_info,
+                                                                     sidecar_threshold=10**4),
+                                       repeat, setup=new_io_params),
+            }
+            print('{:>8}: load {:8.3f} s, dumps {:8.3f} s, save_config {:8.3f} s'.format(
+                name, results[name]['yaml_load']['time'], results[name]['yaml_dumps']['time'],
+                results[name]['save_config']['time']))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base, new, threshold):
+    '''
+    Returns a line for each time or peak memory in new which is more than threshold (a fraction) above that of base.
+    '''
+    regressions = []
+    for config, benchmarks in new['results'].items():
+        for benchmark, values in benchmarks.items():
+            if not isinstance(values, dict):
+                continue
+            for metric, value in values.items():
+                try:
+                    base_value = base['results'][config][benchmark][metric]
+                except KeyError:
+                    continue
+                if base_value > 0 and value > base_value * (1 + threshold):
+                    regressions.append('{}/{}/{}: {:.4g} -> {:.4g} (+{:.0%})'.format(
+                        config, benchmark, metric, base_value, value, value / base_value - 1))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default='benchmark_results.json', help='json file the results are written to')
+    parser.add_argument('--scale', type=float, default=1., help='size of the configs, relative to the defaults')
+    parser.add_argument('--repeat', type=int, default=3, help='the best time of repeat runs is kept')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='compare two result files')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative growth above which a time or peak memory is a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as base_file, open(args.compare[1]) as new_file:
+            regressions = compare(json.load(base_file), json.load(new_file), args.threshold)
+        print('\n'.join(regressions) or 'No regressions above {:.0%}'.format(args.threshold))
+        sys.exit(1 if regressions else 0)
+
+    report = {'commit': git_commit(), 'date': datetime.datetime.now().isoformat(), 'python': sys.version,
+              'platform': platform.platform(), 'numpy': np.__version__, 'scale': args.scale,
+              'results': run_suite(args.scale, args.repeat)}
+    with open(args.out, 'w') as fout:
+        json.dump(report, fout, indent=2)
+    print('Results written to {}'.format(os.path.abspath(args.out)))
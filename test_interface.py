@@ -1,13 +1,23 @@
+import itertools
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import InitVar, field
+from fractions import Fraction
 
 from nptyping.ndarray import NDArray
+from ruamel.yaml.constructor import ConstructorError
 
 import yaml_sci_config.interface_classes
 import yaml_sci_config.load_save
 from yaml_sci_config import yaml_interface
+from yaml_sci_config.config_cache import ConfigCache
+from yaml_sci_config.sweep import Sweep
 from yaml_sci_config.yaml_interface import yaml_dataclass
-from yaml_sci_config.interface_classes import FunctionHandle, PartialFunctionHandle, LogspaceParams
+from yaml_sci_config.interface_classes import FunctionHandle, PartialFunctionHandle, LogspaceParams, LinspaceParams
+import os
 import re
+import sys
+import tempfile
 import numpy as np
 
 @yaml_dataclass
@@ -27,6 +37,21 @@ class TestYamlPostinit(object):
 class TestYamlSubsubclass(TestYamlSubtype):
     a: int
 
+@yaml_dataclass
+class TestYamlDefaults(object):
+    test_type1: float
+    scale: InitVar[float] = 2.
+    test_list: list = field(default_factory=list)
+    test_type2: float = 1.
+    def __post_init__(self, scale):
+        self.test_type3 = scale * self.test_type1 + len(self.test_list)
+
+
+@yaml_dataclass(post_init=False)
+class TestYamlNoPostinit(TestYamlPostinit):
+    pass
+
+
 @yaml_dataclass
 class T(object):
     a: LogspaceParams
@@ -35,6 +60,14 @@ class T(object):
         self.b = np.asarray(self.b)
 
 
+@yaml_dataclass(slots=('test_type3',))
+class TestYamlSlots(object):
+    test_type1: float
+    test_type2: float = 1.
+    def __post_init__(self):
+        self.test_type3 = self.test_type1 + self.test_type2
+
+
 class MyTestCase(unittest.TestCase):
     def test_simple_subtype(self):
         test_yaml_a = '''
@@ -134,6 +167,565 @@ b: 3
         assert (loaded['complex_val'] == (5+2.3j))
         np.testing.assert_array_almost_equal(loaded['np_complex_arr'],np.array([2,3,2e4+5j]))
 
+    def test_array_sidecar(self):
+        big = np.random.default_rng(0).normal(size=(50, 4))
+        small = np.array([1, 2, 3])
+        with tempfile.TemporaryDirectory() as out_dir:
+            fname = os.path.join(out_dir, 'sidecar.yaml')
+            yaml_sci_config.load_save.yaml_save_fname({'big': big, 'small': small}, fname, sidecar_threshold=100)
+            self.assertIn('!nparray_file', open(fname).read())
+            self.assertEqual(len([f for f in os.listdir(out_dir) if f.endswith('.npy')]), 1)
+
+            loaded = yaml_sci_config.load_save.yaml_load_fname(fname, mmap_mode='r')
+            self.assertIsInstance(loaded['big'], np.memmap)
+            np.testing.assert_array_equal(loaded['big'], big)
+            np.testing.assert_array_equal(loaded['small'], small)
+
+            # memory-mapped arrays are saved as any other array.
+            for threshold in (None, 100):
+                resaved = os.path.join(out_dir, 'resaved{}.yaml'.format(threshold))
+                yaml_sci_config.load_save.yaml_save_fname(loaded, resaved, sidecar_threshold=threshold)
+                np.testing.assert_array_equal(yaml_sci_config.load_save.yaml_load_fname(resaved)['big'], big)
+            del loaded
+
+    def test_tagged_scalar_parsers_reused(self):
+        yaml_str = 'a: (1, 2.5, -3e4)\nb: (1, "x")\nc: np.array([[1, 2], [3, 4]])\n'
+        loaded = yaml_sci_config.load_save.yaml_load(yaml_str)
+        resolvers = {ch: len(r) for ch, r in
+                     yaml_interface.yaml_preset.Resolver.yaml_implicit_resolvers.items()}
+        for _ in range(3):
+            yaml_interface.setup_yaml(yaml_interface.yaml_preset, yaml_interface.custom_types)
+            loaded = yaml_sci_config.load_save.yaml_load(yaml_str)
+        self.assertEqual(resolvers, {ch: len(r) for ch, r in
+                                     yaml_interface.yaml_preset.Resolver.yaml_implicit_resolvers.items()})
+        self.assertEqual(loaded['a'], (1, 2.5, -3e4))
+        self.assertEqual(loaded['b'], (1, 'x'))
+        np.testing.assert_array_equal(loaded['c'], [[1, 2], [3, 4]])
+
+    def test_array_dtype_round_trip(self):
+        arrays = {'int8': np.arange(6, dtype=np.int8).reshape(3, 2),
+                  'float32': np.linspace(0, 1, 8, dtype=np.float32).reshape(2, 2, 2),
+                  'complex': np.array([1 + 2j, 3.5 - 1e-9j, np.nan]),
+                  'float': np.array([np.inf, np.nan, 1e-300]),
+                  'bool': np.array([True, False]),
+                  'empty': np.zeros(0),
+                  'empty_2d': np.zeros((2, 0), dtype=np.int32)}
+        loaded = yaml_sci_config.load_save.yaml_load(yaml_sci_config.load_save.yaml_dumps(arrays))
+        for name, arr in arrays.items():
+            self.assertEqual(loaded[name].dtype, arr.dtype)
+            self.assertEqual(loaded[name].shape, arr.shape)
+            np.testing.assert_array_equal(loaded[name], arr)
+        self.assertEqual(yaml_sci_config.load_save.yaml_load('a: !nparray np.array([[], []])')['a'].shape, (2, 0))
+        # integers out of the range of the dtype are not saturated or wrapped by the bulk parser.
+        loaded = yaml_sci_config.load_save.yaml_load('a: np.array([99999999999999999999, 1])\n'
+                                                     'b: np.array([200, 1], dtype=uint8)\n')
+        self.assertEqual(loaded['a'].tolist(), [99999999999999999999, 1])
+        self.assertEqual(loaded['b'].dtype, np.uint8)
+        np.testing.assert_array_equal(loaded['b'], [200, 1])
+        self.assertIsNone(yaml_interface._array_literal_fast('[300, 1]', np.dtype(np.uint8)))
+        self.assertIsNone(yaml_interface._array_literal_fast('[-1, 1]', np.dtype(np.uint8)))
+        dates = np.array(['2020-01-01', '2021-06-30'], dtype='datetime64[D]')
+        loaded = yaml_sci_config.load_save.yaml_load(yaml_sci_config.load_save.yaml_dumps({'dates': dates}))
+        np.testing.assert_array_equal(loaded['dates'].astype(dates.dtype), dates)
+
+        loaded = yaml_sci_config.load_save.yaml_load('a: np.array([2, 3, 2e4+5i])\nb: np.array([1, abc])\n')
+        np.testing.assert_array_equal(loaded['a'], [2, 3, 2e4 + 5j])
+        np.testing.assert_array_equal(loaded['b'], ['1', 'abc'])
+
+    def test_large_array_inline(self):
+        arr = np.random.default_rng(1).normal(size=(4, 30, 30))
+        loaded = yaml_sci_config.load_save.yaml_load(yaml_sci_config.load_save.yaml_dumps({'a': arr}))
+        np.testing.assert_array_equal(loaded['a'], arr)
+
+        with yaml_interface.array_storage(yaml_interface.yaml_preset, b64_threshold=10):
+            str_out = yaml_sci_config.load_save.yaml_dumps({'a': arr, 'b': np.arange(3)})
+        self.assertIn('!nparray_b64', str_out)
+        loaded = yaml_sci_config.load_save.yaml_load(str_out)
+        np.testing.assert_array_equal(loaded['a'], arr)
+        np.testing.assert_array_equal(loaded['b'], np.arange(3))
+
+    def test_lazy_array(self):
+        import copy
+        import pickle
+        big = np.arange(200.).reshape(20, 10)
+        with tempfile.TemporaryDirectory() as out_dir:
+            fname = os.path.join(out_dir, 'lazy.yaml')
+            yaml_sci_config.load_save.yaml_save_fname({'big': big, 'small': np.arange(3)}, fname,
+                                                      sidecar_threshold=100)
+            loaded = yaml_sci_config.load_save.yaml_load_fname(fname, lazy=True)
+            self.assertIsInstance(loaded['small'], yaml_interface.LazyArray)
+            self.assertFalse(loaded['small'].is_materialized)
+            np.testing.assert_array_equal(loaded['small'] + 1, [1, 2, 3])
+            self.assertTrue(loaded['small'].is_materialized)
+            self.assertEqual(loaded['big'].shape, (20, 10))
+            np.testing.assert_array_equal(np.asarray(loaded['big']), big)
+
+            loaded = yaml_sci_config.load_save.yaml_load_fname(fname, lazy=True)
+            for copied in (copy.deepcopy(loaded), pickle.loads(pickle.dumps(loaded))):
+                self.assertFalse(copied['small'].is_materialized)
+                np.testing.assert_array_equal(np.asarray(copied['small']), [0, 1, 2])
+                np.testing.assert_array_equal(np.asarray(copied['big']), big)
+
+    def test_config_cache(self):
+        yaml_str = 'func: !PartialFunctionHandle\n  module_name: numpy\n  function_name: sum\n' \
+                   '  kwargs:\n    axis: -1\narr: np.array([1.5, 2.5])\n'
+        with tempfile.TemporaryDirectory() as out_dir:
+            cache = ConfigCache(os.path.join(out_dir, 'cache'))
+            fname = os.path.join(out_dir, 'cached.yaml')
+            with open(fname, 'w') as fout:
+                fout.write(yaml_str)
+            first = yaml_sci_config.load_save.yaml_load_fname(fname, cache=cache)
+            self.assertEqual(len(cache.entries()), 1)
+            second = yaml_sci_config.load_save.yaml_load_fname(fname, cache=cache)
+            self.assertEqual(len(cache.entries()), 1)
+            np.testing.assert_array_equal(second['arr'], first['arr'])
+            np.testing.assert_array_equal(second['func'](np.array([[1, 2], [3, 4]])), [3, 7])
+
+            with open(fname, 'a') as fout:
+                fout.write('b: 2\n')
+            self.assertEqual(yaml_sci_config.load_save.yaml_load_fname(fname, cache=cache)['b'], 2)
+            self.assertEqual(len(cache.entries()), 2)
+
+            cache.max_bytes = 0
+            cache.evict()
+            self.assertEqual(len(cache.entries()), 0)
+
+    def test_fast_load(self):
+        yaml_str = \
+        '''\
+        post_init: !TestYamlPostinit
+            test_type1: 24
+            test_type2: 25
+        func: !PartialFunctionHandle
+            module_name: "numpy"
+            function_name: "sum"
+            kwargs: {axis: -1}
+        tup: (1, 2.5)
+        complex_val: 5+2.3i
+        arr: np.array([[1, 2], [3, 4]], dtype=int8)
+        nested: [1, {x: y}]
+        '''
+        loaded = yaml_sci_config.load_save.yaml_load(yaml_str, fast=True)
+        self.assertIs(type(loaded), dict)
+        self.assertIs(type(loaded['nested'][1]), dict)
+        self.assertEqual(loaded['post_init'].test_type3, 49)
+        np.testing.assert_array_equal(loaded['func'](np.array([[1, 2], [3, 4]])), [3, 7])
+        self.assertEqual(loaded['tup'], (1, 2.5))
+        self.assertEqual(loaded['complex_val'], 5 + 2.3j)
+        self.assertEqual(loaded['arr'].dtype, np.int8)
+
+        reloaded = yaml_sci_config.load_save.yaml_load(yaml_sci_config.load_save.yaml_dumps(loaded))
+        self.assertEqual(reloaded['post_init'], loaded['post_init'])
+        self.assertEqual(reloaded['func'], loaded['func'])
+        np.testing.assert_array_equal(reloaded['arr'], loaded['arr'])
+
+        # the custom types are registered on yaml_fast's own classes, not ruamel.yaml's SafeRepresenter.
+        import io
+        import ruamel.yaml
+        fout = io.StringIO()
+        ruamel.yaml.YAML(typ='safe').dump({'tup': (1, 2)}, fout)
+        self.assertEqual(fout.getvalue(), 'tup: [1, 2]\n')
+        fout = io.StringIO()
+        yaml_interface.yaml_fast.dump({'tup': (1, 2)}, fout)
+        self.assertEqual(yaml_interface.yaml_fast.load(fout.getvalue()), {'tup': (1, 2)})
+
+    def test_implicit_resolvers(self):
+        yaml_str = \
+        '''\
+        complex_val: -1.5e-3+2j
+        not_complex: 1.5.5j
+        long_number: 111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111111x
+        tup: (1, 2)
+        not_tup: (1)
+        arr: array([1, 2])
+        repeated:
+        - (1, 2)
+        - (1, 2)
+        '''
+        loaded = yaml_sci_config.load_save.yaml_load(yaml_str)
+        self.assertEqual(loaded['complex_val'], -1.5e-3 + 2j)
+        self.assertEqual(loaded['not_complex'], '1.5.5j')
+        self.assertIsInstance(loaded['long_number'], str)
+        self.assertEqual(loaded['tup'], (1, 2))
+        self.assertEqual(loaded['not_tup'], '(1)')
+        np.testing.assert_array_equal(loaded['arr'], [1, 2])
+        self.assertEqual(loaded['repeated'], [(1, 2), (1, 2)])
+        self.assertIsInstance(yaml_sci_config.yaml_interface.yaml_preset.resolver,
+                              yaml_interface.ScientificResolver)
+
+        # tags cached before a resolver is added are forgotten.
+        import ruamel.yaml
+        yaml = ruamel.yaml.YAML(typ='rt')
+        yaml.Resolver = type('LateResolver', (yaml_interface.ScientificResolver,), {})
+        self.assertEqual(yaml.load('a: late-tagged')['a'], 'late-tagged')
+        yaml.Resolver.add_implicit_resolver('!late', ruamel.yaml.util.RegExp('^late-tagged$'), ['l'])
+        self.assertEqual(str(yaml.load('a: late-tagged')['a'].tag), '!late')
+
+    def test_stream(self):
+        sweep = [TestYamlPostinit(test_type1=i, test_type2=1) for i in range(3)]
+        with tempfile.TemporaryDirectory() as out_dir:
+            fname = os.path.join(out_dir, 'sweep.yaml')
+            with open(fname, 'w') as fout:
+                yaml_sci_config.load_save.yaml_dump_stream(({'params': p, 'arr': np.arange(2)} for p in sweep), fout)
+            for fast in [False, True]:
+                loaded = yaml_sci_config.load_save.yaml_load_all_iter(fname, fast=fast)
+                self.assertIsInstance(next(loaded)['arr'], np.ndarray)
+                self.assertEqual([doc['params'].test_type3 for doc in loaded], [2, 3])
+
+    def test_load_many(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            paths = [os.path.join(out_dir, '{}_params.yaml'.format(i)) for i in range(3)]
+            for i, path in enumerate(paths):
+                yaml_sci_config.load_save.yaml_save_fname(
+                    {'params': TestYamlPostinit(test_type1=i, test_type2=1), 'arr': np.arange(100) * i}, path)
+            loaded = yaml_sci_config.load_save.load_many(paths, workers=2, shared_threshold=0)
+            self.assertEqual([par['params'].test_type3 for par in loaded], [1, 2, 3])
+            np.testing.assert_array_equal(loaded[2]['arr'], np.arange(100) * 2)
+            completed = yaml_sci_config.load_save.load_many(paths, workers=2, as_completed=True)
+            self.assertEqual(sorted(path for path, _ in completed), sorted(paths))
+
+    def test_dataclass_defaults(self):
+        yaml_str = \
+        '''\
+        defaults: !TestYamlDefaults
+            test_type1: 3
+        set: !TestYamlDefaults
+            test_type1: 3
+            scale: 3
+            test_list: [1, 2]
+        no_post_init: !TestYamlNoPostinit
+            test_type1: 1
+            test_type2: 2
+        '''
+        for fast in [False, True]:
+            loaded = yaml_sci_config.load_save.yaml_load(yaml_str, fast=fast)
+            self.assertEqual(vars(loaded['defaults']), vars(TestYamlDefaults(test_type1=3)))
+            self.assertEqual(loaded['set'].test_type3, 11)
+            self.assertNotIn('scale', vars(loaded['set']))
+            self.assertEqual(list(vars(loaded['set'])), ['test_type1', 'test_list', 'test_type2', 'test_type3'])
+            self.assertFalse(hasattr(loaded['no_post_init'], 'test_type3'))
+        with self.assertRaises(AttributeError):
+            yaml_sci_config.load_save.yaml_load('!TestYamlDefaults {test_list: []}')
+
+        @yaml_dataclass
+        class RequiredInitVar:
+            x: float
+            scale: InitVar[float]
+
+            def __post_init__(self, scale):
+                self.x *= scale
+
+        self.assertEqual(yaml_sci_config.load_save.yaml_load('!RequiredInitVar {x: 1, scale: 2}').x, 2)
+        for fast in [False, True]:
+            with self.assertRaisesRegex(ConstructorError, 'scale'):
+                yaml_sci_config.load_save.yaml_load('!RequiredInitVar {x: 1}', fast=fast)
+
+    def test_resolved_objects(self):
+        yaml_sci_config.interface_classes.clear_resolved_objects()
+        handles = [FunctionHandle(module_name='numpy', function_name='sum') for _ in range(3)]
+        self.assertIs(handles[0].to_function_handle(), np.sum)
+        self.assertEqual(list(yaml_sci_config.interface_classes._resolved_objects), [('numpy', 'sum')])
+        yaml_sci_config.interface_classes.clear_resolved_objects('numpy')
+        self.assertEqual(yaml_sci_config.interface_classes._resolved_objects, {})
+
+        func = PartialFunctionHandle(module_name='numpy', function_name='sum', kwargs={'axis': -1})
+        np.testing.assert_array_equal(func(np.eye(2) * [1, 2]), [1, 2])
+        func.kwargs = {'axis': 0}
+        np.testing.assert_array_equal(func(np.eye(2) * [[1], [2]]), [1, 2])
+        func.kwargs['axis'] = None
+        func.rebind()
+        self.assertEqual(func(np.eye(2)), 2)
+        self.assertNotIn('_partial', yaml_sci_config.load_save.yaml_dumps(func))
+
+    def test_bound_partial(self):
+        import copy
+        import pickle
+        func = PartialFunctionHandle(module_name='numpy', function_name='clip', args=(0, 1))
+        self.assertIs(func.to_function_handle(), func.to_function_handle())
+        np.testing.assert_array_equal(func([-1, 2]), [0, 1])
+        np.testing.assert_array_equal(func.to_function_handle()(None), 1)
+        bound = func.bind_args_first()
+        self.assertIs(bound, func)
+        np.testing.assert_array_equal(func(None), 1)  # args now come before the call arguments
+        for copied in (copy.deepcopy(func), pickle.loads(pickle.dumps(func)),
+                       yaml_sci_config.load_save.yaml_load(yaml_sci_config.load_save.yaml_dumps(func))):
+            np.testing.assert_array_equal(copied(None), 1)
+
+        cls = yaml_sci_config.interface_classes.PartialClassObject(module_name='fractions', class_name='Fraction',
+                                                                   kwargs={'denominator': 3})
+        self.assertEqual(cls(2), Fraction(2, 3))
+        cls.bind_args_first().kwargs['denominator'] = 4
+        self.assertEqual(cls(2), Fraction(1, 2))
+        self.assertNotIn('_partial', yaml_sci_config.load_save.yaml_dumps(cls))
+        self.assertEqual(copy.deepcopy(cls)(2), Fraction(1, 2))
+
+    def test_deferred_imports(self):
+        interface_classes = yaml_sci_config.interface_classes
+        sys.modules.pop('colorsys', None)
+        interface_classes.clear_resolved_objects('colorsys')
+        yaml_str = '{a: !FunctionHandle {module_name: colorsys, function_name: rgb_to_hsv}, b: [!PartialFunctionHandle {module_name: colorsys, function_name: hsv_to_rgb, args: [1, 1]}]}'
+        with interface_classes.deferred_imports():
+            loaded = yaml_sci_config.load_save.yaml_load(yaml_str)
+        self.assertNotIn('colorsys', sys.modules)
+        self.assertEqual(loaded['b'][0](0), (1, 0, 0))
+        self.assertIn('colorsys', sys.modules)
+        self.assertEqual(loaded['a'], FunctionHandle(module_name='colorsys', function_name='rgb_to_hsv'))
+        interface_classes.warm(loaded, background=True).join()
+        self.assertNotIsInstance(loaded['a']._fn_hand, interface_classes._DeferredFunction)
+
+        @yaml_dataclass(slots=True)
+        class SlottedHandles:
+            post: object
+
+        handles = []
+        interface_classes._function_handles([SlottedHandles(post=loaded['a'])], handles, set())
+        self.assertEqual(len(handles), 1)
+        self.assertIs(handles[0], loaded['a'])
+        interface_classes.warm(SlottedHandles(post=loaded['b']))
+
+    def test_batch_call(self):
+        grid = LogspaceParams(log_start=0, log_stop=2, n_logspace=50)
+        power = PartialFunctionHandle(module_name='numpy', function_name='power', args=(2,))
+        self.assertTrue(power.is_vectorized())
+        np.testing.assert_allclose(power.map_grid(grid), grid.to_np_array()**2)
+        gamma = FunctionHandle(module_name='math', function_name='gamma')
+        self.assertFalse(gamma.is_vectorized())
+        expected = [gamma(x) for x in grid.to_np_array()]
+        np.testing.assert_allclose(gamma.map_grid(grid, chunk_size=7), expected)
+        with ThreadPoolExecutor(2) as executor:
+            np.testing.assert_allclose(gamma.map_grid(grid, chunk_size=7, executor=executor), expected)
+        pair = FunctionHandle(module_name='numpy', function_name='atleast_1d')
+        self.assertEqual(pair.batch_call(np.ones((2, 3)), chunk_size=4).shape, (2, 3, 1))
+        # results of mixed types are promoted, rather than cast to the type of the first.
+        at_least_one = PartialFunctionHandle(module_name='builtins', function_name='max', args=(1,))
+        np.testing.assert_array_equal(at_least_one.batch_call([0.0, 2.5, 3.7], vectorized=False, chunk_size=2),
+                                      [1., 2.5, 3.7])
+        repeat = PartialFunctionHandle(module_name='operator', function_name='mul', args=('ab',))
+        np.testing.assert_array_equal(repeat.batch_call([1, 3], vectorized=False), ['ab', 'ababab'])
+
+    def test_sweep(self):
+        params = {'lr': LogspaceParams(log_start=-3, log_stop=-1, n_logspace=3), 'name': 'run',
+                  'model': T(a=LinspaceParams(lin_start=1, lin_stop=4, n_linspace=4), b=np.zeros(2))}
+        sweep = Sweep(params)
+        expected = list(itertools.product(np.logspace(-3, -1, 3).tolist(), [1., 2., 3., 4.]))
+        self.assertEqual(len(sweep), 12)
+        self.assertEqual([(point['lr'], point['model'].a) for point in sweep], expected)
+        self.assertIs(sweep[0]['model'].b, params['model'].b)
+        self.assertIsInstance(params['model'].a, LinspaceParams)
+        self.assertEqual(sorted(k for shard in range(5) for k in sweep.shard(shard, 5).indices), list(range(12)))
+        self.assertEqual(len(set(sweep.sample(6, seed=0).indices)), 6)
+        self.assertEqual([len(chunk) for chunk in sweep.chunks(5)], [5, 5, 2])
+
+        zipped = Sweep({'x': LinspaceParams(lin_start=0, lin_stop=1, n_linspace=3),
+                        'y': LinspaceParams(lin_start=1, lin_stop=2, n_linspace=3)}, mode='zip')
+        self.assertEqual(zipped[2], {'x': 1., 'y': 2.})
+        huge = Sweep([LinspaceParams(lin_start=0, lin_stop=1, n_linspace=10**6) for _ in range(3)])
+        self.assertEqual(huge[-1], [1., 1., 1.])
+
+    def test_cached_grid(self):
+        grid = LogspaceParams(log_start=-3, log_stop=2, n_logspace=1001)
+        values = grid.to_np_array()
+        np.testing.assert_array_equal(values, np.logspace(-3, 2, 1001))
+        self.assertIs(grid.to_np_array(), values)
+        self.assertFalse(values.flags.writeable)
+        self.assertEqual(grid.to_np_array(np.float32).dtype, np.float32)
+        np.testing.assert_array_equal(np.concatenate(list(grid.iter_chunks(100))), values)
+        grid.n_logspace = 11
+        np.testing.assert_array_equal(grid.to_np_array(), np.logspace(-3, 2, 11))
+
+        # the cache is bounded by size: grids larger than its bound are not kept, older grids make room for newer.
+        interface_classes = yaml_sci_config.interface_classes
+        max_bytes = interface_classes.grid_cache_max_bytes
+        interface_classes.grid_cache_max_bytes = 2000 * 8
+        try:
+            interface_classes.clear_grid_cache()
+            large = LinspaceParams(lin_start=0, lin_stop=1, n_linspace=2001)
+            self.assertIsNot(large.to_np_array(), large.to_np_array())
+            first = LinspaceParams(lin_start=0, lin_stop=1, n_linspace=1000)
+            first_values = first.to_np_array()
+            self.assertIs(first.to_np_array(), first_values)
+            LinspaceParams(lin_start=0, lin_stop=2, n_linspace=1000).to_np_array()
+            LinspaceParams(lin_start=0, lin_stop=3, n_linspace=1000).to_np_array()
+            self.assertIsNot(first.to_np_array(), first_values)
+        finally:
+            interface_classes.grid_cache_max_bytes = max_bytes
+            interface_classes.clear_grid_cache()
+
+    def test_snapshot(self):
+        model = {'weights': np.arange(5000.), 'layers': list(range(2000))}
+        with tempfile.TemporaryDirectory() as out_dir:
+            for run in range(2):
+                fname = os.path.join(out_dir, 'run{}.yaml'.format(run))
+                yaml_sci_config.load_save.yaml_save_snapshot({'run': run, 'model': model}, fname)
+            self.assertIn('!snapshot', open(fname).read())
+            self.assertEqual(len(os.listdir(os.path.join(out_dir, 'snapshots'))), 2)
+            for snapshot in os.listdir(os.path.join(out_dir, 'snapshots')):
+                self.assertEqual(os.stat(os.path.join(out_dir, 'snapshots', snapshot)).st_mode & 0o777,
+                                 yaml_interface._new_file_mode)
+
+            loaded = yaml_sci_config.load_save.yaml_load_fname(fname)
+            self.assertEqual(loaded['run'], 1)
+            self.assertEqual(loaded['model']['layers'], model['layers'])
+            np.testing.assert_array_equal(loaded['model']['weights'], model['weights'])
+
+    def test_save_config_async(self):
+        from yaml_sci_config.interface_classes import IOParams, RunInfoParams
+        params = {'lr': 0.1, 'weights': np.arange(2000.)}
+        with tempfile.TemporaryDirectory() as out_dir:
+            saved = yaml_sci_config.load_save.save_config_async(
+                params, IOParams(out_dir=out_dir, prefix='run'), RunInfoParams('in.yaml'), sidecar_threshold=100)
+            params['lr'] = 0.2
+            params['weights'] += 1
+            fname = saved.result()
+            self.assertEqual(os.path.dirname(fname), out_dir)
+            self.assertFalse([f for f in os.listdir(out_dir) if f.endswith('.tmp')])
+            loaded = yaml_sci_config.load_save.yaml_load_fname(fname)
+            self.assertEqual(loaded['lr'], 0.1)
+            self.assertEqual(loaded['io_params'].prefix, 'run')
+            np.testing.assert_array_equal(loaded['weights'], np.arange(2000.))
+
+    def test_config_patch(self):
+        from yaml_sci_config.config_patch import ConfigPatch
+        text = ('# solver settings\n'
+                'solver:\n'
+                '  tol: 1.0e-06  # absolute\n'
+                '  grid: !nparray np.array([1, 2, 3])\n'
+                'name: run\n'
+                'old: 1\n')
+        with tempfile.TemporaryDirectory() as out_dir:
+            fname = os.path.join(out_dir, 'params.yaml')
+            with open(fname, 'w') as fout:
+                fout.write(text)
+            patch = ConfigPatch(fname)
+            patch.set(('solver', 'tol'), 1e-8)
+            patch.set(('extra',), [1, 2])
+            patch.delete(('old',))
+            os.chmod(fname, 0o640)
+            patch.write()
+            self.assertEqual(os.stat(fname).st_mode & 0o777, 0o640)
+            self.assertEqual(open(fname).read(), text.replace('1.0e-06', '1e-08').replace('old: 1\n', '')
+                             + 'extra:\n- 1\n- 2\n')
+            loaded = yaml_sci_config.load_save.yaml_load_fname(fname)
+            self.assertEqual(loaded['solver']['tol'], 1e-8)
+            self.assertEqual(loaded['extra'], [1, 2])
+
+            with open(fname, 'w') as fout:
+                fout.write('a: [1, 2]  # list\nb: {x: 1, y: {z: 2}}\n')
+            patch = ConfigPatch(fname)
+            patch.set(('b', 'x'), 2)
+            patch.set(('a', 1), 3)
+            patch.write()
+            self.assertEqual(open(fname).read(), 'a: [1, 3]  # list\nb: {x: 2, y: {z: 2}}\n')
+            self.assertEqual(yaml_sci_config.load_save.yaml_load_fname(fname)['b']['x'], 2)
+
+    def test_profile_yaml(self):
+        import json
+        from yaml_sci_config.profiling import profile_yaml
+        text = 'a: !nparray np.array([1, 2, 3])\nb: (1, 2)\nc: !TestYamlSubtype\n  test_type1: 1\n  test_type2: 2\n'
+        constructor = yaml_interface.yaml_preset.Constructor
+        with profile_yaml(n_largest=2) as report:
+            loaded = yaml_sci_config.load_save.yaml_load(text)
+            yaml_sci_config.load_save.yaml_dumps(loaded)
+
+            @yaml_dataclass
+            class ProfiledLateRecord:
+                value: int
+        self.assertIs(yaml_interface.yaml_preset.Constructor, constructor)
+        yaml_str = yaml_sci_config.load_save.yaml_dumps({'late': ProfiledLateRecord(1)})
+        self.assertIn('!ProfiledLateRecord', yaml_str)
+        self.assertEqual(yaml_sci_config.load_save.yaml_load(yaml_str)['late'], ProfiledLateRecord(1))
+        self.assertNotIn('load', vars(yaml_interface.yaml_preset))
+        self.assertEqual(report['load']['calls'], 1)
+        self.assertEqual(report['load']['bytes'], len(text))
+        self.assertEqual(report['tags']['!TestYamlSubtype']['count'], 1)
+        self.assertEqual(report['tags']['!nparray']['count'], 1)
+        self.assertEqual(report['types']['TestYamlSubtype']['count'], 1)
+        self.assertEqual([node['tag'] for node in report['largest_nodes']], ['tag:yaml.org,2002:map', '!TestYamlSubtype'])
+        self.assertEqual(report['largest_nodes'][0]['size'], len(text))
+        json.dumps(report)
+
+    def test_slots(self):
+        import pickle
+        obj = TestYamlSlots(test_type1=2.)
+        self.assertFalse(hasattr(obj, '__dict__'))
+        with self.assertRaises(AttributeError):
+            obj.other = 1
+        yaml_str = yaml_sci_config.load_save.yaml_dumps({'a': obj, 'b': obj})
+        for fast in (False, True):
+            loaded = yaml_sci_config.load_save.yaml_load(yaml_str, fast=fast)
+            self.assertEqual(loaded['a'], obj)
+            self.assertEqual(loaded['a'].test_type3, 3.)
+            self.assertIs(loaded['a'], loaded['b'])
+        self.assertEqual(yaml_sci_config.load_save.yaml_dumps(loaded), yaml_str)
+        self.assertEqual(pickle.loads(pickle.dumps(obj)).test_type3, 3.)
+
+    def test_columnar_records(self):
+        records = [TestYamlSubtype(test_type1=i, test_type2=0.5 * i) for i in range(5)]
+        yaml_str = yaml_sci_config.load_save.yaml_dumps({'records': records, 'other': [TestYamlSubtype(1, 2), 3]})
+        for yaml in (yaml_interface.yaml_preset, yaml_interface.yaml_fast):
+            with yaml_interface.columnar_records(yaml):
+                loaded = yaml.load(yaml_str)
+            columns = loaded['records']
+            self.assertIsInstance(columns, yaml_interface.RecordColumns)
+            self.assertEqual(columns['test_type1'].dtype, np.int64)
+            np.testing.assert_array_equal(columns['test_type2'], 0.5 * np.arange(5))
+            self.assertEqual(columns[2], records[2])
+            self.assertEqual(list(columns[3:]), records[3:])
+            self.assertNotIsInstance(loaded['other'], yaml_interface.RecordColumns)
+            self.assertEqual(yaml_sci_config.load_save.yaml_dumps(loaded), yaml_str)
+        self.assertIsInstance(yaml_interface.yaml_fast.load(yaml_str)['records'], list)
+
+        mixed = ('- !TestYamlSubtype {test_type1: 1, test_type2: 1}\n'
+                 '- !TestYamlSubtype {test_type1: 2, test_type2: 1.5}\n'
+                 '- !TestYamlSubtype {test_type1: 3, test_type2: .inf}\n')
+        for yaml in (yaml_interface.yaml_preset, yaml_interface.yaml_fast):
+            with yaml_interface.columnar_records(yaml):
+                columns = yaml.load(mixed)
+            self.assertEqual(columns['test_type2'].dtype, np.float64)
+            np.testing.assert_array_equal(columns['test_type2'], [1., 1.5, np.inf])
+
+        @yaml_dataclass
+        class DerivedRecord:
+            x: float
+            double: float = field(init=False, default=0.)
+
+            def __post_init__(self):
+                self.double = 2 * self.x
+
+        records = [DerivedRecord(1.), DerivedRecord(2.)]
+        with yaml_interface.columnar_records(yaml_interface.yaml_preset):
+            loaded = yaml_sci_config.load_save.yaml_load(yaml_sci_config.load_save.yaml_dumps(records))
+        self.assertEqual(loaded, records)
+
+    def test_clone(self):
+        import copy
+        from yaml_sci_config.clone import clone, freeze_arrays
+        handle = PartialFunctionHandle.init_from_function_handle(np.sum, axis=0)
+        base = freeze_arrays({'solver': {'tol': 1e-6, 'grid': np.arange(4.)}, 'post': handle,
+                              'sub': TestYamlSubtype(test_type1=1, test_type2=2)})
+        self.assertFalse(base['solver']['grid'].flags.writeable)
+        variant = clone(base, {('solver', 'tol'): 1e-8, ('solver', 'new'): {'a': 1}, ('sub', 'test_type2'): 5})
+        self.assertEqual(base['solver'], {'tol': 1e-6, 'grid': base['solver']['grid']})
+        self.assertEqual(variant['solver']['tol'], 1e-8)
+        self.assertEqual(variant['solver']['new'], {'a': 1})
+        self.assertIs(variant['solver']['grid'], base['solver']['grid'])
+        self.assertIs(variant['post'], handle)
+        self.assertEqual((base['sub'].test_type2, variant['sub'].test_type2), (2, 5))
+        with self.assertRaises(ValueError):
+            clone(base, {('solver',): {}, ('solver', 'tol'): 1.})
+
+        # __post_init__ runs on cloned dataclasses, so derived attributes follow and checks are made.
+        slotted = clone(TestYamlSlots(test_type1=1., test_type2=1.), {('test_type1',): 10.})
+        self.assertEqual(slotted.test_type3, 11.)
+        with self.assertRaises(AssertionError):
+            clone(LogspaceParams(log_start=0, log_stop=2, n_logspace=5), {('log_stop',): -1})
+        bound = clone(PartialFunctionHandle(module_name='numpy', function_name='clip', args=(0, 1)).bind_args_first(),
+                      {('kwargs',): {}})
+        self.assertEqual(bound(None), 1)
+        handle_copy = copy.deepcopy(handle)
+        self.assertIs(handle_copy._fn_hand, handle._fn_hand)
+        self.assertIsNot(handle_copy.kwargs, handle.kwargs)
+        np.testing.assert_array_equal(handle_copy(np.ones((2, 3))), [2., 2., 2.])
 
 
 if __name__ == '__main__':
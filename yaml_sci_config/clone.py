@@ -0,0 +1,119 @@
+import copy
+from dataclasses import fields, replace
+
+import numpy as np
+
+
+class _Overrides(dict):
+    '''
+    New values below one container of a config, by key. Any value which is not an _Overrides replaces its key.
+    '''
+
+
+def _overrides_tree(overrides):
+    tree = _Overrides()
+    for path, value in overrides.items():
+        node = tree
+        for depth, step in enumerate(path[:-1]):
+            node = node.setdefault(step, _Overrides())
+            if not isinstance(node, _Overrides):
+                raise ValueError('Overrides of both {!r} and values inside it'.format(path[:depth + 1]))
+        if isinstance(node.get(path[-1]), _Overrides):
+            raise ValueError('Overrides of both {!r} and values inside it'.format(path))
+        node[path[-1]] = value
+    return tree
+
+
+def _substitute(obj, overrides):
+    '''
+    Returns a copy of obj with values replaced as given by overrides.
+    Only the containers on the paths to the new values are copied; the rest is shared.
+    '''
+    if not isinstance(overrides, _Overrides):
+        return overrides
+    if isinstance(obj, tuple):
+        items = list(obj)
+        for index, override in overrides.items():
+            items[index] = _substitute(items[index], override)
+        return type(obj)(items)
+    if isinstance(obj, (dict, list)):
+        new = copy.copy(obj)
+        for key, override in overrides.items():
+            new[key] = _substitute(obj[key], override) if isinstance(override, _Overrides) else override
+        return new
+    return _replace(obj, {name: _substitute(getattr(obj, name), override) for name, override in overrides.items()})
+
+
+def _instance_state(obj):
+    state = getattr(obj, '__dict__', None)
+    if state is not None:
+        return state
+    return {name: getattr(obj, name) for name in getattr(type(obj), '__state_slots__', ()) if hasattr(obj, name)}
+
+
+def _replace(obj, changes):
+    '''
+    Returns a copy of the dataclass instance obj with the fields in changes replaced.
+    The copy is made with dataclasses.replace, so __post_init__ runs on it: attributes derived from the fields are
+        computed again and checks are made again. Other attributes of obj which it did not set, e.g. the args_first
+        of a bound PartialFunctionHandle or the anchor of a loaded instance, are kept, as are changed fields
+        which are not __init__ arguments.
+    '''
+    init_names = {data_field.name for data_field in fields(obj) if data_field.init}
+    new = replace(obj, **{name: value for name, value in changes.items() if name in init_names})
+    new_state = _instance_state(new)
+    kept = {name: value for name, value in _instance_state(obj).items() if name not in new_state}
+    kept.update({name: value for name, value in changes.items() if name not in init_names})
+    for name, value in kept.items():
+        if obj.__dataclass_params__.frozen:
+            object.__setattr__(new, name, value)
+        else:
+            setattr(new, name, value)
+    return new
+
+
+def clone(config, overrides=None):
+    '''
+    Returns a copy of config in which the value at each path of overrides (a dict of {path: new value}) is replaced,
+        where a path is a tuple of the keys, indices or attribute names leading to a value,
+        through dicts, lists, tuples and dataclasses. A path can also end in a new key of a dict.
+    Dataclasses on the paths are copied with dataclasses.replace, so their __post_init__ runs on the new values.
+    The copy is copy-on-write: only the containers on the paths are copied, and everything else, including
+        numpy arrays and FunctionHandles with their resolved functions, is shared with config.
+    So many variants of one base config take memory in proportion to their overrides, rather than to the config,
+        as with copy.deepcopy. Shared values should not be changed in place: use freeze_arrays on the base config
+        to make its arrays read-only, and clone with a new value instead of changing a shared one.
+
+    example:
+
+        base = freeze_arrays(yaml_load_fname('params.yaml'))
+        variants = [clone(base, {('solver', 'tol'): tol}) for tol in np.logspace(-8, -4, 10**4)]
+    '''
+    if not overrides:
+        return copy.copy(config)
+    if () in overrides:
+        return overrides[()]
+    return _substitute(config, _overrides_tree(overrides))
+
+
+def freeze_arrays(config):
+    '''
+    Makes every numpy array in config read-only, through dicts, lists, tuples and dataclasses,
+        so that arrays shared between clones can't be changed in place by mistake. Returns config.
+    '''
+    seen = set()
+    stack = [config]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            obj.flags.writeable = False
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif hasattr(obj, '__dataclass_fields__') and not isinstance(obj, type):
+            stack.extend(getattr(obj, name) for name in obj.__dataclass_fields__ if hasattr(obj, name))
+    return config
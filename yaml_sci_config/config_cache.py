@@ -0,0 +1,137 @@
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+from dataclasses import MISSING, fields, is_dataclass
+
+import yaml_sci_config
+from yaml_sci_config.yaml_interface import yaml_classes, custom_types, custom_constructors
+
+
+# fingerprints by class. A redefined class is a new class object, and so gets a new fingerprint.
+_class_fingerprints = {}
+
+
+def _class_fingerprint(cls):
+    '''
+    Describes a registered class such that any change to its definition changes the description:
+        its fields (names, types and defaults) and, where available, its source code.
+    '''
+    if cls in _class_fingerprints:
+        return _class_fingerprints[cls]
+    parts = [cls.__module__, cls.__qualname__]
+    if is_dataclass(cls):
+        for field in fields(cls):
+            default = field.default if field.default is not MISSING else field.default_factory
+            parts.append('{}:{}={!r}'.format(field.name, field.type, default))
+    try:
+        parts.append(inspect.getsource(cls))
+    except (OSError, TypeError):
+        pass
+    _class_fingerprints[cls] = '\n'.join(parts)
+    return _class_fingerprints[cls]
+
+
+def registry_fingerprint():
+    '''
+    Hash of the library version and every registered tag and class definition.
+    Parsed configs cached under a different fingerprint are not reused.
+    '''
+    sha = hashlib.sha256(yaml_sci_config.__version__.encode())
+    for tag in sorted([*custom_types, *custom_constructors]):
+        sha.update(tag.encode())
+    for tag in sorted(yaml_classes):
+        sha.update(tag.encode())
+        sha.update(_class_fingerprint(yaml_classes[tag]).encode())
+    return sha.hexdigest()
+
+
+class ConfigCache:
+    '''
+    On-disk cache of parsed config files, so that loading the same file again skips parsing entirely.
+
+    The parsed object graph is pickled to cache_dir, keyed by a hash of the file's bytes, the load options,
+        the library version and every registered tag and yaml_dataclass definition (see registry_fingerprint).
+    Changing the file or a registered dataclass therefore gives a new key.
+    When the cache grows beyond max_bytes, the least recently used entries are deleted.
+
+    example:
+
+        cache = ConfigCache('~/.cache/my_sweep')
+        params = yaml_load_fname('params.yaml', cache=cache)
+
+    :param cache_dir: (str) directory where parsed configs are stored. Created if it doesn't exist.
+    :param max_bytes: (int) total size of the cached entries above which the oldest ones are evicted.
+    '''
+    suffix = '.pickle'
+
+    def __init__(self, cache_dir, max_bytes=2**30):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, file_bytes, **load_options):
+        sha = hashlib.sha256(file_bytes)
+        sha.update(repr(sorted(load_options.items())).encode())
+        sha.update(registry_fingerprint().encode())
+        return sha.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def get(self, key):
+        '''
+        Returns the cached object for key, or None if there is none.
+        '''
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fin:
+                obj = pickle.load(fin)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)  # the modification time orders entries for eviction.
+        return obj
+
+    def put(self, key, obj):
+        # write to a temporary file first, so that a concurrent reader never sees a partly written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fout:
+                pickle.dump(obj, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def entries(self):
+        '''
+        Returns (modification time, size, path) of every cached entry, oldest first.
+        '''
+        entries = []
+        for fname in os.listdir(self.cache_dir):
+            if fname.endswith(self.suffix):
+                path = os.path.join(self.cache_dir, fname)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # evicted by another process.
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
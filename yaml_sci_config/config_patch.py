@@ -0,0 +1,174 @@
+import io
+import os
+import re
+
+from ruamel.yaml import CommentedMap
+
+from yaml_sci_config.load_save import yaml_load, _dump_fname
+from yaml_sci_config.yaml_interface import yaml_preset, array_storage, _write_atomic
+
+
+def _get(obj, key):
+    if isinstance(obj, (dict, list, tuple)):
+        return obj[key]
+    return getattr(obj, key)
+
+
+def _set(obj, key, value):
+    if isinstance(obj, (dict, list)):
+        obj[key] = value
+    else:
+        setattr(obj, key, value)
+
+
+class ConfigPatch:
+    '''
+    Edits a config file, loaded round-trip, by rewriting only the entries which were changed,
+        so comments, formatting and the text of every other entry (e.g. long arrays) stay exactly as they were.
+
+    Changes are made with set() and delete(), which also apply them to self.data.
+    Each change is recorded against the innermost mapping entry of the file which contains it:
+        on write(), only those entries are dumped again and spliced into the original text,
+        found from the line and column ruamel.yaml records for every loaded key.
+    So the cost of write() grows with the size of the changed entries, plus copying the text around them,
+        rather than with dumping the whole config. New top-level keys are added at the end of the file.
+
+    example:
+
+        patch = ConfigPatch('params.yaml')
+        patch.set(('solver', 'tol'), 1e-8)
+        patch.write()
+    '''
+
+    def __init__(self, fname, sidecar_threshold=None, b64_threshold=None):
+        self.fname = fname
+        self.sidecar_threshold = sidecar_threshold
+        self.b64_threshold = b64_threshold
+        with open(fname, 'r') as filep:
+            self.text = filep.read()
+        with array_storage(yaml_preset, directory=os.path.dirname(fname)):
+            self.data = yaml_load(self.text)
+        self._line_starts = None
+        # changed entries, as (mapping, key), by (id(mapping), key).
+        self._changed = {}
+
+    def set(self, path, value):
+        '''
+        Sets the value at path, a tuple of keys, indices or attribute names.
+        '''
+        _set(self.get(path[:-1]), path[-1], value)
+        self._mark(path)
+
+    def delete(self, path):
+        '''
+        Removes the key at the end of path from its mapping.
+        '''
+        del self.get(path[:-1])[path[-1]]
+        self._mark(path[:-1] if len(path) > 1 else path)
+
+    def get(self, path):
+        obj = self.data
+        for key in path:
+            obj = _get(obj, key)
+        return obj
+
+    def _mark(self, path):
+        '''
+        Records the change of path against the innermost entry of the original file which contains it.
+        Entries of flow style mappings ({x: 1}) are not on lines of their own, so the block entry around them is.
+        '''
+        mapping, key = self.data, path[0]
+        obj = self.data
+        for depth, step in enumerate(path[:-1]):
+            obj = _get(obj, step)
+            if not isinstance(obj, CommentedMap) or obj.fa.flow_style() or path[depth + 1] not in obj.lc.data:
+                break
+            mapping, key = obj, path[depth + 1]
+        self._changed[id(mapping), key] = (mapping, key)
+
+    def _line(self, index):
+        return self.text[self._line_starts[index]:self._line_starts[index + 1] - 1]
+
+    def _entry(self, mapping, key):
+        '''
+        Returns the start and end offsets in the original text of the entry key of mapping, without its end of line
+            comment. The entry is continued by the following lines indented further than the key, or as far
+            with a sequence item, up to the last such line which is not blank or a comment.
+        '''
+        key_line, key_col = mapping.lc.data[key][:2]
+        n_lines = len(self._line_starts) - 1
+        line_index = last = key_line + 1
+        while line_index < n_lines:
+            line = self._line(line_index)
+            stripped = line.lstrip(' ')
+            indent = len(line) - len(stripped)
+            line_index += 1
+            if not stripped.strip() or (stripped.startswith('#') and indent > key_col):
+                continue
+            if indent > key_col or (indent == key_col and (stripped == '-' or stripped.startswith('- '))):
+                last = line_index
+                continue
+            break
+        start = self._line_starts[key_line] + key_col
+        end = self._line_starts[last] - 1
+        comment = mapping.ca.items.get(key, [None] * 3)[2]
+        if last == key_line + 1 and comment is not None and comment.start_mark.line == key_line:
+            end = self._line_starts[key_line] + comment.start_mark.column
+            while end > start and self.text[end - 1] in ' \t':
+                end -= 1
+        return start, end
+
+    def _dump_entry(self, key, value, indent):
+        fout = io.StringIO()
+        _dump_fname({key: value}, self.fname, fout, self.sidecar_threshold, self.b64_threshold)
+        lines = fout.getvalue().rstrip('\n').split('\n')
+        return '\n'.join([lines[0]] + [' ' * indent + line if line else line for line in lines[1:]])
+
+    def patched_text(self):
+        '''
+        Returns the text of the file with the changes so far spliced in.
+        '''
+        if self._line_starts is None:
+            text = self.text if self.text.endswith('\n') else self.text + '\n'
+            self._line_starts = [0] + [match.end() for match in re.finditer('\n', text)]
+        edits, appended = [], []
+        for mapping, key in self._changed.values():
+            if key not in mapping.lc.data:
+                if key in mapping:
+                    appended.append(self._dump_entry(key, mapping[key], 0) + '\n')
+                continue
+            start, end = self._entry(mapping, key)
+            if key in mapping:
+                replacement = self._dump_entry(key, mapping[key], mapping.lc.data[key][1])
+                line_end = self.text.find('\n', end)
+                line_end = len(self.text) if line_end < 0 else line_end
+                comment = self.text[end:line_end].strip()
+                if comment and replacement.split('\n', 1)[0].endswith(comment):
+                    end = line_end  # dumped with the value, as for a flow style collection.
+                elif '\n' in replacement and line_end > end:
+                    # keep the end of line comment on the key line.
+                    first, rest = replacement.split('\n', 1)
+                    replacement, end = first + self.text[end:line_end] + '\n' + rest, line_end
+                edits.append((start, end, replacement))
+            else:
+                # a deleted top-level key: remove its lines.
+                edits.append((start, min(end + 1, len(self.text)), ''))
+        edits.sort(key=lambda edit: (edit[0], -edit[1]))
+        pieces, position = [], 0
+        for start, end, replacement in edits:
+            if start < position:
+                continue  # inside an entry which is rewritten as a whole.
+            pieces += [self.text[position:start], replacement]
+            position = end
+        pieces.append(self.text[position:])
+        text = ''.join(pieces)
+        if appended and text and not text.endswith('\n'):
+            text += '\n'
+        return text + ''.join(appended)
+
+    def write(self, fname=None):
+        '''
+        Writes the patched text atomically to fname, by default the file it was loaded from.
+        '''
+        text = self.patched_text()
+        _write_atomic(fname or self.fname, lambda fout: fout.write(text.encode()))
@@ -1,8 +1,12 @@
 import datetime
 import importlib
 import sys
+import threading
+import warnings
+from collections import OrderedDict
+from contextlib import contextmanager
 from copy import deepcopy
-from dataclasses import field
+from dataclasses import field, fields, is_dataclass
 from functools import partial
 from inspect import isclass
 from typing import Callable, Any
@@ -13,6 +17,152 @@ import numpy as np
 from yaml_sci_config.yaml_interface import yaml_dataclass
 
 
+# functions and classes looked up by FunctionHandle and ClassObject, by (module_name, name).
+_resolved_objects = {}
+
+
+def resolve_object(module_name, name):
+    '''
+    Returns the object called name in module module_name, importing the module if needed.
+    Lookups are cached for the whole process, so many handles to the same function import and look it up once.
+    Raises AttributeError if the module has no such object.
+    '''
+    try:
+        return _resolved_objects[module_name, name]
+    except KeyError:
+        pass
+    obj = getattr(importlib.import_module(module_name), name)
+    _resolved_objects[module_name, name] = obj
+    return obj
+
+
+def clear_resolved_objects(module_name=None):
+    '''
+    Forgets the cached lookups of resolve_object, or only those in module_name if given.
+    Call it after reloading a module (importlib.reload), so that handles created afterwards use the reloaded objects.
+    '''
+    if module_name is None:
+        _resolved_objects.clear()
+    else:
+        for key in [key for key in _resolved_objects if key[0] == module_name]:
+            del _resolved_objects[key]
+
+
+# whether FunctionHandle defers importing its function until it is first used (see deferred_imports).
+_defer_imports = False
+
+
+@contextmanager
+def deferred_imports(enabled=True):
+    '''
+    Context manager in which created (e.g. loaded) FunctionHandles don't import their module,
+        unless it is already imported, until the function is first called or asked for with to_function_handle().
+    Configs naming slow to import modules then load quickly, when the run does not use them.
+    Use warm() to import them all at once, possibly in a background thread.
+
+    example:
+
+        with deferred_imports():
+            params = yaml_load_fname('params.yaml')
+        warm(params, background=True)
+    '''
+    global _defer_imports
+    previous = _defer_imports
+    _defer_imports = enabled
+    try:
+        yield
+    finally:
+        _defer_imports = previous
+
+
+class _DeferredFunction:
+    '''
+    Stands in for the function of a FunctionHandle until it is first called, then imports it (see deferred_imports).
+    '''
+
+    def __init__(self, handle):
+        self.handle = handle
+
+    def __call__(self, *args, **kwds):
+        fn = self.handle.warm()._fn_hand
+        if fn is None:
+            raise RuntimeError('No Function assigned to FunctionHandle. '
+                               'Check warnings to see which function was not found.')
+        return fn(*args, **kwds)
+
+    def __eq__(self, other):
+        return self.handle.warm()._fn_hand == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<deferred {}.{}>'.format(self.handle.module_name, self.handle.function_name)
+
+
+def _function_handles(obj, found, seen):
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, FunctionHandle):
+        found.append(obj)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            _function_handles(value, found, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            _function_handles(value, found, seen)
+    elif is_dataclass(obj) and not isinstance(obj, type):
+        # through fields rather than vars(), which slotted dataclasses don't have.
+        for data_field in fields(obj):
+            _function_handles(getattr(obj, data_field.name, None), found, seen)
+
+
+def _deepcopy_handle(handle, memo, target):
+    '''
+    Deep copies a FunctionHandle or ClassObject. Note that getstate is ignored and instead all items are copied,
+        except the resolved function or class (named target), which is shared, and bound partials,
+        which are bound again from the copied args and kwargs.
+    '''
+    cls = handle.__class__
+    result = cls.__new__(cls)
+    memo[id(handle)] = result
+    bound_names = getattr(cls, '_bound_names', ())
+    state = result.__dict__
+    for k, v in handle.__dict__.items():
+        if k == target:
+            state[k] = v
+        elif k not in bound_names:
+            state[k] = deepcopy(v, memo)
+    if bound_names:
+        result.rebind()
+    return result
+
+
+def _call_elements(handle, values):
+    # module level, so that process pools can pickle it (see FunctionHandle.batch_call).
+    return [handle(value) for value in values]
+
+
+def warm(obj, background=False):
+    '''
+    Imports the functions of all FunctionHandles in obj (e.g. a loaded config), which were deferred by deferred_imports.
+    If background is set, imports them in a daemon thread instead, and returns the thread.
+    '''
+    handles = []
+    _function_handles(obj, handles, set())
+
+    def warm_handles():
+        for handle in handles:
+            handle.warm()
+
+    if not background:
+        warm_handles()
+        return None
+    thread = threading.Thread(target=warm_handles, name='warm', daemon=True)
+    thread.start()
+    return thread
+
+
 @yaml_dataclass
 class FunctionHandle:
     '''
@@ -41,15 +191,25 @@ class FunctionHandle:
     _fn_hand: Callable = None
 
     def __post_init__(self) -> None:
-        self._fn_hand = self.get_function_handle()
+        if _defer_imports and self.module_name not in sys.modules:
+            self._fn_hand = _DeferredFunction(self)
+        else:
+            self._fn_hand = self.get_function_handle()
+
+    def warm(self) -> 'FunctionHandle':
+        '''
+        Imports the function now, if that was deferred (see deferred_imports). Returns the handle.
+        '''
+        if isinstance(self._fn_hand, _DeferredFunction):
+            self._fn_hand = self.get_function_handle()
+        return self
 
     def to_function_handle(self) -> Callable:
-        return self._fn_hand
+        return self.warm()._fn_hand
 
     def get_function_handle(self) -> Callable:
-        module = importlib.import_module(self.module_name)
         try:
-            fn = getattr(module, self.function_name)
+            fn = resolve_object(self.module_name, self.function_name)
             if not callable(fn):
                 raise ValueError(
                     'The function given: (module: {.module_name}, function: {.function_name}) is not callable'.format(
@@ -61,6 +221,49 @@ class FunctionHandle:
 
         return fn
 
+    def is_vectorized(self) -> bool:
+        '''
+        Whether the function is known to apply elementwise to whole arrays: a numpy ufunc or np.vectorize.
+        '''
+        return isinstance(self.warm()._fn_hand, (np.ufunc, np.vectorize))
+
+    def batch_call(self, values, vectorized=None, chunk_size=2**12, executor=None) -> np.ndarray:
+        '''
+        Calls the handle on every element of the array values, and returns the results in one array,
+            of shape values.shape followed by the shape of each result.
+        If vectorized (by default, if is_vectorized()), the handle is instead called once on the whole array.
+        Otherwise, elements are called in chunks of chunk_size, which are handed to executor
+            (a concurrent.futures thread or process pool) if given.
+
+        example:
+
+            f = FunctionHandle(module_name='math', function_name='gamma')
+            f.batch_call(np.linspace(1, 5, 10**6), executor=ProcessPoolExecutor())
+        '''
+        values = np.asarray(values)
+        if vectorized is None:
+            vectorized = self.is_vectorized()
+        if vectorized:
+            return np.asarray(self(values))
+
+        flat = values.reshape(-1)
+        if flat.size == 0:
+            return np.empty(values.shape)
+        chunks = [flat[start:start + chunk_size] for start in range(0, flat.size, chunk_size)]
+        if executor is None:
+            results = (_call_elements(self, chunk) for chunk in chunks)
+        else:
+            results = executor.map(_call_elements, [self] * len(chunks), chunks)
+        # the dtype is promoted over all the results, e.g. to float if some are ints and some floats.
+        out = np.concatenate([np.asarray(result) for result in results])
+        return out.reshape(values.shape + out.shape[1:])
+
+    def map_grid(self, grid: 'ArrayParams', **batch_kwargs) -> np.ndarray:
+        '''
+        Calls the handle on every point of grid (e.g. LogspaceParams), with batch_call.
+        '''
+        return self.batch_call(grid.to_np_array(), **batch_kwargs)
+
     def __call__(self, *args: Any, **kwds: Any) -> Any:
         if self._fn_hand is not None:
             return self._fn_hand(*args, **kwds)
@@ -98,14 +301,13 @@ class FunctionHandle:
             pass
         return state
 
+    def __setstate__(self, state):
+        # Restores the function handle dropped by __getstate__, e.g. when unpickling.
+        self.__dict__.update(state)
+        self.__post_init__()
+
     def __deepcopy__(self, memo):
-        # In case you need to perform a deepcopy.  Note that getstate is ignored and instead we copy all items.
-        cls = self.__class__
-        result = cls.__new__(cls)
-        memo[id(self)] = result
-        for k, v in self.__dict__.items():
-            setattr(result, k, deepcopy(v, memo))
-        return result
+        return _deepcopy_handle(self, memo, '_fn_hand')
 
     # def check_equal(self,other):
     #     def print_ne():
@@ -130,8 +332,71 @@ class FunctionHandle:
     #                     print_ne(); return False
 
 
+class _PartialBinding:
+    '''
+    Binds the function or class of a partial handle (the attribute named by _target) to its args and kwargs
+        in a functools.partial, when the handle is created and whenever the target, args or kwargs are assigned.
+
+    By default, args are passed after the arguments of each call. After bind_args_first(), calls go straight to
+        the partial, so args are passed first, as with to_function_handle() and functools.partial.
+        This changes what a call does, so it is kept when the handle is copied, pickled or dumped (as args_first).
+    '''
+    _target = None
+    _bound_names = ('_partial', '_kw_partial', '_call')  # kept up to date by rebind(), never saved
+    args_first = False
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in (self._target, 'args', 'kwargs', 'args_first'):
+            self.rebind()
+
+    def rebind(self) -> None:
+        '''
+        Binds the function to the current args and kwargs. Only needed after changing args or kwargs in place,
+            and not after bind_args_first(), which binds kwargs to the dict of the partial itself.
+        '''
+        state = self.__dict__
+        target = state.get(self._target)
+        args = tuple(state.get('args', ()))
+        kwargs = state.get('kwargs', {})
+        bound = state.get('args_first', False)
+        if target is None:
+            state['_partial'] = state['_kw_partial'] = state['_call'] = None
+            return
+        state['_partial'] = partial(target, *args, **kwargs)
+        state['_kw_partial'] = partial(target, **kwargs)
+        state['_call'] = state['_partial'] if bound or not args else None
+        if bound:
+            state['args'] = args
+            state['kwargs'] = state['_partial'].keywords
+
+    def bind_args_first(self):
+        '''
+        Switches calls to pass args before the arguments of each call, instead of after them, as functools.partial does.
+            Calls then go straight to the bound partial, which costs about as much as calling it directly.
+        kwargs becomes the dict of the partial itself, so it can still be changed in place.
+        Returns the handle.
+        '''
+        self.args_first = True
+        return self
+
+    def __call__(self, *args: Any, **kwds: Any) -> Any:
+        call = self._call
+        if call is not None:
+            return call(*args, **kwds)
+        if self._kw_partial is not None:
+            return self._kw_partial(*args, *self.args, **kwds)
+        return super().__call__(*args, *self.args, **kwds, **self.kwargs)  # raises the missing target error
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        for name in self._bound_names:
+            state.pop(name, None)
+        return state
+
+
 @yaml_dataclass
-class PartialFunctionHandle(FunctionHandle):
+class PartialFunctionHandle(_PartialBinding, FunctionHandle):
     '''
     A Class which allows one to read in a function with yaml and special arguments and keyword arguments.
 
@@ -147,6 +412,10 @@ class PartialFunctionHandle(FunctionHandle):
 
     frac_part(2.4) == 0.4
 
+    The function is bound to args and kwargs in a functools.partial once, rather than on every call,
+        and bound again whenever args or kwargs are assigned; after changing them in place, call rebind().
+    In hot loops, use to_function_handle() (the partial itself) or bind_args_first() (see _PartialBinding).
+
     Parameters:
         module_name (str):
             The module inside of which the function is defined.
@@ -158,9 +427,7 @@ class PartialFunctionHandle(FunctionHandle):
 
     kwargs: dict = field(default_factory=dict)  #
     args: tuple = field(default_factory=tuple)  #
-
-    def __call__(self, *args: Any, **kwds: Any) -> Any:
-        return super().__call__(*args, *self.args, **kwds, **self.kwargs)
+    _target = '_fn_hand'
 
     @classmethod
     def init_from_function_handle(cls, fn_handle, *args, **kwargs):
@@ -173,7 +440,7 @@ class PartialFunctionHandle(FunctionHandle):
         return FnHand
 
     def to_function_handle(self) -> Callable:
-        return partial(self._fn_hand, *self.args, **self.kwargs)
+        return self.warm()._partial
 
 
 @yaml_dataclass
@@ -201,9 +468,8 @@ class ClassObject:
         return self._cls
 
     def get_class_obj(self) -> Callable:
-        module = importlib.import_module(self.module_name)
         try:
-            cls = getattr(module, self.class_name)
+            cls = resolve_object(self.module_name, self.class_name)
             if not isclass(cls):
                 raise ValueError(
                     'The class given: (module: {.module_name}, class: {.class_name}) does not seem to be a class'.format(
@@ -230,18 +496,17 @@ class ClassObject:
         del state['_cls']
         return state
 
+    def __setstate__(self, state):
+        # Restores the class object dropped by __getstate__, e.g. when unpickling.
+        self.__dict__.update(state)
+        self.__post_init__()
+
     def __deepcopy__(self, memo):
-        # In case you need to perform a deepcopy.  Note that getstate is ignored and instead we copy all items.
-        cls = self.__class__
-        result = cls.__new__(cls)
-        memo[id(self)] = result
-        for k, v in self.__dict__.items():
-            setattr(result, k, deepcopy(v, memo))
-        return result
+        return _deepcopy_handle(self, memo, '_cls')
 
 
 @yaml_dataclass
-class PartialClassObject(ClassObject):
+class PartialClassObject(_PartialBinding, ClassObject):
     '''
     A Class which allows one to read in an abitrary object with yaml and special arguments and keyword arguments.
 
@@ -256,13 +521,13 @@ class PartialClassObject(ClassObject):
     (by computing the number x mod 1)
 
     frac_part(2.4) == 0.4
+
+    As for PartialFunctionHandle, the class is bound to args and kwargs once (see _PartialBinding).
     '''
 
     kwargs: dict = field(default_factory=dict)  #
     args: tuple = field(default_factory=tuple)  #
-
-    def __call__(self, *args: Any, **kwds: Any) -> Any:
-        return super().__call__(*args, *self.args, **kwds, **self.kwargs)
+    _target = '_cls'
 
     @classmethod
     def init_from_class(cls, class_given, *args, **kwargs):
@@ -322,11 +587,84 @@ class IOParams:
             self.out_dir = out_dir
 
 
+def _grid_chunk(spacing, start, stop, n_points, begin, end):
+    '''
+    Returns the values at indices begin to end of np.linspace(start, stop, n_points), or of np.logspace
+        if spacing is 'log', computed as they do but without computing the other values.
+    '''
+    if n_points == 1:
+        values = np.full(end - begin, float(start))
+    else:
+        values = np.arange(begin, end, dtype=float) * ((stop - start) / (n_points - 1)) + start
+        if end == n_points:
+            values[-1] = stop
+    return np.power(10.0, values) if spacing == 'log' else values
+
+
+# the total size in bytes of the grids kept by to_np_array. The least recently used grids are dropped beyond it,
+#   and larger grids are not cached at all.
+grid_cache_max_bytes = 2**27
+# cached grids, by their parameters and dtype, least recently used first.
+_grid_cache = OrderedDict()
+_grid_cache_lock = threading.Lock()
+
+
+def _cached_grid(spacing, start, stop, n_points, dtype):
+    key = (spacing, start, stop, n_points, dtype)
+    with _grid_cache_lock:
+        grid = _grid_cache.get(key)
+        if grid is not None:
+            _grid_cache.move_to_end(key)
+            return grid
+    grid_fn = np.logspace if spacing == 'log' else np.linspace
+    grid = grid_fn(start, stop, n_points).astype(dtype, copy=False)
+    grid.flags.writeable = False
+    if grid.nbytes <= grid_cache_max_bytes:
+        with _grid_cache_lock:
+            grid = _grid_cache.setdefault(key, grid)
+            n_bytes = sum(cached.nbytes for cached in _grid_cache.values())
+            while n_bytes > grid_cache_max_bytes:
+                n_bytes -= _grid_cache.popitem(last=False)[1].nbytes
+    return grid
+
+
+def clear_grid_cache():
+    '''
+    Frees the grids cached by ArrayParams.to_np_array.
+    '''
+    with _grid_cache_lock:
+        _grid_cache.clear()
+
+
 @yaml_dataclass
 class ArrayParams:
-    def to_np_array(self):
+    '''
+    A 1-D grid of values. Subclasses describe it with _grid_params(): (spacing, start, stop, number of points),
+        where spacing is 'lin' or 'log'.
+    '''
+    def _grid_params(self):
         raise (NotImplementedError('Abstract Class has no method'))
 
+    def to_np_array(self, dtype=None) -> np.ndarray:
+        '''
+        Returns the grid as a read-only array, of dtype (by default, float64; e.g. np.float32 to save memory).
+        Grids are cached by their parameters and dtype, so repeated calls (and equal ArrayParams) share one array,
+            and changing a field gives a new grid. The cache holds up to grid_cache_max_bytes of grids;
+            larger grids are computed on every call (see iter_chunks).
+        '''
+        return _cached_grid(*self._grid_params(), np.dtype(float if dtype is None else dtype).str)
+
+    def iter_chunks(self, chunk_size=2**16, dtype=None):
+        '''
+        Yields the grid in consecutive arrays of chunk_size values, computing each chunk only when it is needed,
+            for grids which are too large to hold in memory. The values are the same as those of to_np_array.
+        '''
+        spacing, start, stop, n_points = self._grid_params()
+        for begin in range(0, n_points, chunk_size):
+            end = min(begin + chunk_size, n_points)
+            yield _grid_chunk(spacing, start, stop, n_points, begin, end).astype(float if dtype is None else dtype,
+                                                                               copy=False)
+
 
 # @yaml_dataclass
 # class NpArray(ArrayParams):
@@ -365,8 +703,8 @@ class LogspaceParams(ArrayParams):
         assert (self.log_start < self.log_stop)
         assert (self.n_logspace > 0 and self.n_logspace == int(self.n_logspace))
 
-    def to_np_array(self):
-        return np.logspace(self.log_start, self.log_stop, self.n_logspace)
+    def _grid_params(self):
+        return 'log', self.log_start, self.log_stop, int(self.n_logspace)
 
 
 @yaml_dataclass
@@ -389,5 +727,5 @@ class LinspaceParams(ArrayParams):
         # assert(self.log_start < self.log_stop)
         assert (self.n_linspace > 0 and self.n_linspace == int(self.n_linspace))
 
-    def to_np_array(self):
-        return np.linspace(self.lin_start, self.lin_stop, self.n_linspace)
+    def _grid_params(self):
+        return 'lin', self.lin_start, self.lin_stop, int(self.n_linspace)
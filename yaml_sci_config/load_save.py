@@ -1,25 +1,41 @@
 import argparse
+import atexit
+import concurrent.futures
+import hashlib
+import importlib
+import io
+import pickle
+import threading
+from functools import partial
+from multiprocessing import resource_tracker, shared_memory
 
+import numpy as np
 import ruamel.yaml
 from ruamel.yaml import CommentedMap
 
-from yaml_sci_config.interface_classes import RunInfoParams, IOParams
-from yaml_sci_config.yaml_interface import yaml_preset, setup_yaml, custom_types
+from yaml_sci_config.config_cache import ConfigCache
+from yaml_sci_config.interface_classes import RunInfoParams, IOParams, deferred_imports
+from yaml_sci_config.yaml_interface import yaml_preset, yaml_fast, setup_yaml, custom_types, array_storage, \
+    yaml_classes, columnar_records, SnapshotRef, _write_atomic, _write_once, _yaml_like
 import os
 
-def parse_args_cli(parser=None):
+def parse_args_cli(parser=None,cache:ConfigCache=None,fast=False,defer_imports=False):
     '''
     Adds functionality to a file, to read in parameters from a yaml file.
     Adds requirement to file, that it is executed with either "-y FNAME" or "--yaml_fname FNAME,"
         where FNAME is the name of the YAML parameter file where parameters are stored
     :return: params_yml: the native output of PYYAML after
             args: list of all arguments provided to the script
+    If a ConfigCache is given, the parsed parameter file is cached (see yaml_load_fname).
+    If fast is set, the parameters are loaded into plain dicts, without comments (see yaml_load).
+    If defer_imports is set, FunctionHandles import their module when first called instead (see deferred_imports).
     '''
     if parser is None: parser = argparse.ArgumentParser()
 
     parser.add_argument('-y','--yaml_fname',required=True)
     args = parser.parse_args()
-    params_yml = yaml_load_fname(args.yaml_fname)
+    with deferred_imports(defer_imports):
+        params_yml = yaml_load_fname(args.yaml_fname,cache=cache,fast=fast)
     return params_yml,args
 
 
@@ -27,7 +43,10 @@ def get_run_info(yaml_fname)->RunInfoParams:
     return RunInfoParams(yaml_fname)
 
 
-def save_config(params_yml,io_params:IOParams,run_info:RunInfoParams):
+def _config_record(params_yml,io_params,run_info):
+    '''
+    Returns the mapping saved by save_config and the name of the file it is saved to.
+    '''
     if not isinstance(params_yml,(dict,CommentedMap)):
         raise TypeError('params_yml must be mappable')
     out_params = params_yml.copy()
@@ -36,21 +55,313 @@ def save_config(params_yml,io_params:IOParams,run_info:RunInfoParams):
     out_dir = io_params.out_dir
     prefix = io_params.prefix
     save_filename = '{}_{}_params.yaml'.format(prefix, run_info.time_exec.strftime('%Y-%m-%d_%H%M%S'))
-    out_fname = os.path.join(out_dir, save_filename)
-    yaml_save_fname(out_params,out_fname)
+    return out_params, os.path.join(out_dir, save_filename)
+
+
+def save_config(params_yml,io_params:IOParams,run_info:RunInfoParams,sidecar_threshold=None,b64_threshold=None,
+                snapshot=False):
+    '''
+    Saves params_yml, together with run_info and io_params, to a new params file in io_params.out_dir.
+    If snapshot is set, it is saved as a snapshot (see yaml_save_snapshot), whose large arrays and sections
+        are shared with the earlier runs saved to the same out_dir; sidecar_threshold then defaults to 1000.
+    '''
+    out_params, out_fname = _config_record(params_yml,io_params,run_info)
+    if snapshot:
+        yaml_save_snapshot(out_params,out_fname,b64_threshold=b64_threshold,
+                           sidecar_threshold=10**3 if sidecar_threshold is None else sidecar_threshold)
+    else:
+        yaml_save_fname(out_params,out_fname,sidecar_threshold=sidecar_threshold,b64_threshold=b64_threshold)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _background_writer():
+    '''
+    Returns the thread which writes the files of save_config_async, started on first use.
+    Its pending writes are finished when the interpreter exits.
+    '''
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix='save_config')
+            atexit.register(_writer.shutdown)
+    return _writer
+
+
+def _write_files(pending,out_fname,text):
+    for path, write in pending:
+        _write_once(path, write)
+    _write_atomic(out_fname, partial(_write_bytes, text.encode()))
+    return out_fname
+
+
+def save_config_async(params_yml,io_params:IOParams,run_info:RunInfoParams,sidecar_threshold=None,
+                      b64_threshold=None,snapshot=False):
+    '''
+    Saves the config as save_config does, but returns a concurrent.futures.Future right away,
+        while the files are written by a background thread, so a slow file system does not hold up the caller.
+    The config is turned into yaml text, and arrays saved in sidecar files are copied, before returning,
+        so later changes to params_yml do not change what is saved.
+    Files are written atomically, and saves still pending are finished before the interpreter exits.
+    The future's result() is the name of the params file, once it is written, and raises any error of the write.
+
+    example:
+
+        saved = save_config_async(params, io_params, run_info)
+        run(params)
+        saved.result()
+    '''
+    out_params, out_fname = _config_record(params_yml,io_params,run_info)
+    pending = []
+    fout = io.StringIO()
+    if snapshot:
+        _dump_snapshot(out_params,out_fname,fout,'snapshots',
+                       10**3 if sidecar_threshold is None else sidecar_threshold,b64_threshold,2**12,pending)
+    else:
+        _dump_fname(out_params,out_fname,fout,sidecar_threshold,b64_threshold,pending)
+    return _background_writer().submit(_write_files,pending,out_fname,fout.getvalue())
+
 
-def yaml_load_fname(fname):
-    with open(fname,'r') as filep:
-        par_obj = yaml_load(filep)
+def yaml_load_fname(fname,mmap_mode=None,verify=True,lazy=False,cache:ConfigCache=None,fast=False,columnar=False):
+    '''
+    Loads a yaml file.
+    Arrays stored in sidecar .npy files (see yaml_save_fname) are loaded relative to the directory of fname.
+    mmap_mode is passed on to np.load for these arrays: 'r' memory-maps them read-only instead of reading them.
+    If lazy is set, numpy arrays are loaded as LazyArray placeholders, which are only parsed when first used.
+    If a ConfigCache is given, a file which was loaded before is read from the cache instead of parsed.
+        Lazy loads are not cached, and sidecar arrays come from the cache as copies rather than memory-maps.
+    If fast is set, the file is loaded into plain dicts and lists, without comments (see yaml_load).
+    If columnar is set, lists of records of one yaml_dataclass class are loaded as RecordColumns, an array per field
+        (see columnar_records); columnar can also be the minimum number of records for a list to be loaded so.
+    '''
+    directory = os.path.dirname(fname)
+    yaml = yaml_fast if fast else yaml_preset
+    min_length = int(columnar) if columnar else None
+    if cache is not None and not lazy:
+        with open(fname,'rb') as filep:
+            file_bytes = filep.read()
+        key = cache.key(file_bytes, directory=os.path.abspath(directory), mmap_mode=mmap_mode, verify=verify,
+                        fast=fast, columnar=min_length)
+        par_obj = cache.get(key)
+        if par_obj is None:
+            with array_storage(yaml, directory=directory, mmap_mode=mmap_mode, verify=verify), \
+                    columnar_records(yaml, min_length):
+                par_obj = yaml_load(file_bytes.decode(), yaml=yaml)
+            cache.put(key, par_obj)
+        return par_obj
+
+    with open(fname,'r') as filep, \
+            array_storage(yaml, directory=directory, mmap_mode=mmap_mode, verify=verify, lazy=lazy), \
+            columnar_records(yaml, min_length):
+        par_obj = yaml_load(filep, yaml=yaml)
     return par_obj
 
 
-def yaml_save_fname(yaml_obj,fname):
+def _stream_yaml(fast=False):
+    '''
+    Returns a new YAML instance set up like yaml_fast (if fast) or yaml_preset, including registered yaml_dataclass classes.
+    A document stream is read or written over many calls, so it gets its own instance,
+        rather than holding on to the parser state and array storage options of the shared one in between.
+    '''
+    return _yaml_like(yaml_fast if fast else yaml_preset)
+
+
+def yaml_load_all_iter(fname,mmap_mode=None,verify=True,lazy=False,fast=False):
+    '''
+    Generator which loads the documents of a multi-document yaml file (separated by "---") one at a time.
+    Only the current document is kept in memory, so arbitrarily long files (such as parameter sweeps) can be processed.
+    The options are as for yaml_load_fname.
+
+    example:
+
+        for params in yaml_load_all_iter('sweep.yaml'):
+            run(params)
+    '''
+    yaml = _stream_yaml(fast)
+    with open(fname,'r') as filep, \
+            array_storage(yaml, directory=os.path.dirname(fname), mmap_mode=mmap_mode, verify=verify, lazy=lazy):
+        for par_obj in yaml.load_all(filep):
+            if hasattr(yaml, 'doc_infos'):  # not in older ruamel.yaml, e.g. 0.17
+                del yaml.doc_infos[:-1]  # ruamel.yaml keeps the version info of every document read so far.
+            yield par_obj
+
+
+def yaml_dump_stream(documents,fout):
+    '''
+    Writes each object of the iterable documents to fout as a separate yaml document, as it is produced.
+    With a generator, documents are written one at a time and never held in memory together.
+
+    example:
+
+        with open('sweep.yaml', 'w') as fout:
+            yaml_dump_stream((Params(lr=lr) for lr in np.logspace(-5, -1, 1000)), fout)
+    '''
+    _stream_yaml().dump_all(documents, fout)
+
+
+class _SharedArrayPickler(pickle.Pickler):
+    '''
+    Pickler which stores numpy arrays of at least shared_threshold bytes in shared memory blocks,
+        and pickles only the name, dtype and shape of each block.
+    '''
+
+    def __init__(self, file, shared_threshold):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared_threshold = shared_threshold
+
+    def persistent_id(self, obj):
+        if type(obj) not in (np.ndarray, np.memmap) or obj.dtype.hasobject or obj.nbytes < self.shared_threshold:
+            return None
+        shm = shared_memory.SharedMemory(create=True, size=obj.nbytes)
+        np.ndarray(obj.shape, obj.dtype, buffer=shm.buf)[...] = obj
+        shm.close()
+        return shm.name, obj.dtype.str, obj.shape
+
+
+class _SharedArrayUnpickler(pickle.Unpickler):
+    '''
+    Unpickler for _SharedArrayPickler, which copies each array out of its shared memory block and frees the block.
+    '''
+
+    def persistent_load(self, pid):
+        name, dtype, shape = pid
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            return np.ndarray(shape, dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def _import_modules(module_names):
+    '''
+    Worker process initializer, which imports the modules defining yaml_dataclass classes so they are registered.
+    Only needed when worker processes are spawned rather than forked.
+    '''
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+
+def _load_shared(fname, shared_threshold, load_options):
+    with io.BytesIO() as buffer:
+        _SharedArrayPickler(buffer, shared_threshold).dump(yaml_load_fname(fname, **load_options))
+        return buffer.getvalue()
+
+
+def load_many(paths,workers=None,as_completed=False,shared_threshold=2**16,**load_options):
+    '''
+    Loads many yaml files in parallel, with a pool of workers worker processes (by default, one per CPU).
+    Returns a list of the loaded objects in the order of paths.
+        If as_completed is set, instead returns an iterator of (path, loaded object) as each file finishes loading.
+    Numpy arrays of at least shared_threshold bytes are passed back from the workers through shared memory,
+        instead of being pickled. Everything else is pickled, so loaded objects must be picklable.
+    load_options (mmap_mode, verify, cache, fast) are passed on to yaml_load_fname.
+    The modules defining yaml_dataclass classes are imported in each worker.
+        Classes defined in the script run as __main__ are only available if the script guards its
+        entry point with if __name__ == '__main__' (see the multiprocessing documentation).
+
+    example:
+
+        index = load_many(glob.glob('out/*_params.yaml'), workers=16, fast=True)
+    '''
+    paths = list(paths)
+    module_names = sorted({cls.__module__ for cls in yaml_classes.values()} - {'__main__'})
+    # workers inherit a running resource tracker, instead of each starting their own.
+    # Otherwise the shared memory blocks which workers create and this process frees are reported as leaked.
+    resource_tracker.ensure_running()
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_import_modules,
+                                                      initargs=(module_names,))
+    futures = {executor.submit(_load_shared, path, shared_threshold, load_options): path for path in paths}
+    results = _shared_results(executor, futures, as_completed)
+    return results if as_completed else [par_obj for _, par_obj in results]
+
+
+def _shared_results(executor, futures, as_completed):
+    '''
+    Yields (path, loaded object) for load_many. If loading stops early (an error, or the iterator is closed),
+        the shared memory of results which were not yet unpickled is freed.
+    '''
+    pending = dict(futures)
+    try:
+        for future in concurrent.futures.as_completed(futures) if as_completed else futures:
+            path = pending.pop(future)
+            yield path, _SharedArrayUnpickler(io.BytesIO(future.result())).load()
+    finally:
+        for future in pending:
+            future.cancel()
+        for future in pending:
+            if not future.cancelled() and future.exception() is None:
+                _SharedArrayUnpickler(io.BytesIO(future.result())).load()
+        executor.shutdown()
+
+
+def yaml_save_fname(yaml_obj,fname,sidecar_threshold=None,b64_threshold=None):
+    '''
+    Saves yaml_obj to the file fname.
+    If sidecar_threshold is given, numpy arrays with more elements than sidecar_threshold are saved
+        in binary .npy files next to fname, and fname only contains a reference to them.
+    If b64_threshold is given, the remaining numpy arrays with more elements than b64_threshold are saved
+        inline as base64 encoded bytes instead of text.
+    '''
     with open(fname,'w') as fout:
+        _dump_fname(yaml_obj,fname,fout,sidecar_threshold,b64_threshold)
+
+
+def _dump_fname(yaml_obj,fname,fout,sidecar_threshold,b64_threshold,pending=None):
+    '''
+    Dumps yaml_obj to fout, as yaml_save_fname saves it to fname.
+    If a list pending is given, sidecar files are added to it instead of written (see ArrayStorageOptions).
+    '''
+    prefix = os.path.splitext(os.path.basename(fname))[0] + '_'
+    with array_storage(yaml_preset, sidecar_threshold=sidecar_threshold, b64_threshold=b64_threshold,
+                       directory=os.path.dirname(fname), prefix=prefix, pending=pending):
         yaml_dump(yaml_obj,fout)
 
 
-def yaml_load(fin,yaml = yaml_preset, custom_setup=True):
+def yaml_save_snapshot(yaml_obj,fname,store='snapshots',sidecar_threshold=10**3,b64_threshold=None,
+                       section_threshold=2**12):
+    '''
+    Saves the mapping yaml_obj to the file fname, sharing its large parts with the other snapshots in the same directory.
+    Numpy arrays with more elements than sidecar_threshold, and top-level entries whose yaml is longer than
+        section_threshold characters, are saved in the directory store next to fname, in files named by the checksum
+        of their contents, and fname only contains a reference to them (!nparray_file or !snapshot).
+    A file which is already in the store is not written again, so a part shared by many runs is stored once.
+    Files are written atomically, so runs can save to the same store concurrently.
+    fname is loaded by yaml_load_fname, as any other file.
+    '''
+    with open(fname,'w') as fout:
+        _dump_snapshot(yaml_obj,fname,fout,store,sidecar_threshold,b64_threshold,section_threshold)
+
+
+def _write_bytes(data,fout):
+    fout.write(data)
+
+
+def _dump_snapshot(yaml_obj,fname,fout,store,sidecar_threshold,b64_threshold,section_threshold,pending=None):
+    '''
+    Dumps yaml_obj to fout, as yaml_save_snapshot saves it to fname.
+    If a list pending is given, the files of the store are added to it instead of written.
+    '''
+    directory = os.path.dirname(fname)
+    with array_storage(yaml_preset, sidecar_threshold=sidecar_threshold, b64_threshold=b64_threshold,
+                       directory=directory, prefix=store + '/', pending=pending):
+        snapshot = yaml_obj.copy()
+        for key, value in yaml_obj.items():
+            if isinstance(value, (str, int, float, bool, type(None))):
+                continue
+            data = yaml_dumps(value).encode()
+            if len(data) <= section_threshold:
+                continue
+            checksum = hashlib.sha256(data).hexdigest()
+            path = '{}/{}.yaml'.format(store, checksum[:16])
+            _write_once(os.path.join(directory, path), partial(_write_bytes, data), pending)
+            snapshot[key] = SnapshotRef(path, checksum)
+        yaml_dump(snapshot,fout)
+
+
+def yaml_load(fin,yaml = yaml_preset, custom_setup=True, fast=False):
     '''
     A convenient wrapper around yaml.load().
     Note that fin, just as for yaml.load(), accepts strings as well as file objects.
@@ -58,7 +369,12 @@ def yaml_load(fin,yaml = yaml_preset, custom_setup=True):
     If we want to start from scratch and configure new YAML instance,
         we set yaml=None. custom_setup
         then will setup yaml to deal with custom types
+    If fast is set, yaml_fast is used instead: a safe loader which gives plain dicts and lists and drops comments,
+        but is several times faster (and uses the C loader when ruamel.yaml.clib is installed).
+        All custom types and yaml_dataclass classes are still loaded.
     '''
+    if fast:
+        yaml = yaml_fast
     if yaml is None: # note: not default.
         yaml = ruamel.yaml.YAML(typ='rt')
         if custom_setup:
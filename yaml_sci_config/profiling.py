@@ -0,0 +1,238 @@
+import heapq
+import time
+from contextlib import contextmanager
+
+import yaml_sci_config.interface_classes as interface_classes
+from yaml_sci_config.yaml_interface import yaml_preset
+
+
+def _stream_position(stream):
+    try:
+        return stream.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _stream_bytes(stream, start):
+    '''
+    Returns the number of bytes read from or written to stream since position start, or the size of a string.
+    '''
+    if isinstance(stream, bytes):
+        return len(stream)
+    if isinstance(stream, str):
+        return len(stream.encode())
+    end = _stream_position(stream)
+    return None if start is None or end is None else end - start
+
+
+class _Profiler:
+    '''
+    Collects the statistics reported by profile_yaml, from the wrappers it installs.
+    '''
+
+    def __init__(self, n_largest):
+        self.n_largest = n_largest
+        self.report = {
+            'load': {'calls': 0, 'time': 0., 'bytes': 0, 'compose_time': 0., 'construct_time': 0.,
+                     'resolve_calls': 0, 'resolve_time': 0.},
+            'dump': {'calls': 0, 'time': 0., 'bytes': 0, 'represent_time': 0., 'emit_time': 0.},
+            'tags': {},
+            'types': {},
+            'imports': {},
+            'largest_nodes': [],
+        }
+        self.largest = []
+        # time spent in nested calls, for each call in progress.
+        self.stack = []
+
+    def timed(self, counts, key, fn, *args):
+        '''
+        Calls fn(*args), adding its count, cumulative time and own time (without nested timed calls) to counts[key].
+        '''
+        self.stack.append(0.)
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self.stack.pop()
+            if self.stack:
+                self.stack[-1] += elapsed
+            entry = counts.get(key)
+            if entry is None:
+                entry = counts[key] = {'count': 0, 'time': 0., 'cumulative_time': 0.}
+            entry['count'] += 1
+            entry['time'] += elapsed - nested
+            entry['cumulative_time'] += elapsed
+
+    def node(self, node, tag):
+        start, end = getattr(node, 'start_mark', None), getattr(node, 'end_mark', None)
+        if start is None or end is None or self.n_largest <= 0:
+            return
+        item = (end.index - start.index, start.line + 1, tag)
+        if len(self.largest) < self.n_largest:
+            heapq.heappush(self.largest, item)
+        elif item > self.largest[0]:
+            heapq.heapreplace(self.largest, item)
+
+    def finish(self):
+        self.report['load']['compose_time'] = self.report['load']['time'] - self.report['load']['construct_time']
+        self.report['dump']['emit_time'] = self.report['dump']['time'] - self.report['dump']['represent_time']
+        self.report['largest_nodes'] = [{'size': size, 'line': line, 'tag': tag}
+                                        for size, line, tag in sorted(self.largest, reverse=True)]
+
+
+def _profiled_constructor(base, base_resolve, profiler):
+    load = profiler.report['load']
+    tags = profiler.report['tags']
+
+    class ProfiledConstructor(base):
+        def construct_document(self, node):
+            start = time.perf_counter()
+            try:
+                return base.construct_document(self, node)
+            finally:
+                load['construct_time'] += time.perf_counter() - start
+
+        def construct_non_recursive_object(self, node, tag=None):
+            key = str(node.tag if tag is None else tag)
+            profiler.node(node, key)
+            return profiler.timed(tags, key, base.construct_non_recursive_object, self, node, tag)
+
+    def resolve(self, *args):
+        # the C loader is its own resolver, and finds resolve on the constructor class first.
+        return _timed_resolve(load, base_resolve, self, *args)
+
+    ProfiledConstructor.resolve = resolve
+    ProfiledConstructor.__name__ = base.__name__
+    return ProfiledConstructor
+
+
+def _timed_resolve(load, resolve, *args):
+    start = time.perf_counter()
+    try:
+        return resolve(*args)
+    finally:
+        load['resolve_calls'] += 1
+        load['resolve_time'] += time.perf_counter() - start
+
+
+def _profiled_representer(base, profiler):
+    dump = profiler.report['dump']
+    types = profiler.report['types']
+
+    class ProfiledRepresenter(base):
+        def represent(self, data):
+            start = time.perf_counter()
+            try:
+                return base.represent(self, data)
+            finally:
+                dump['represent_time'] += time.perf_counter() - start
+
+        def represent_data(self, data):
+            return profiler.timed(types, type(data).__name__, base.represent_data, self, data)
+
+    ProfiledRepresenter.__name__ = base.__name__
+    return ProfiledRepresenter
+
+
+def _keep_registrations(profiled, base, registries):
+    '''
+    Adds the constructors or representers registered on the profiled subclass while profiling
+        (e.g. of a yaml_dataclass defined in a module imported by a FunctionHandle) to its base class.
+    '''
+    for registry, add in registries:
+        registered = vars(profiled).get(registry, {})
+        inherited = getattr(base, registry)
+        for key, value in registered.items():
+            if inherited.get(key) is not value:
+                getattr(base, add)(key, value)
+
+
+@contextmanager
+def profile_yaml(yaml=yaml_preset, n_largest=10):
+    '''
+    Context manager which profiles the loads and dumps of the YAML instance yaml while it is open,
+        and yields a dict which holds the report when it is closed:
+
+        load: calls, total time, bytes parsed, and the time spent composing the node tree
+            (scanning, parsing and resolving implicit tags; resolve_time on its own) and constructing objects from it.
+        dump: calls, total time, bytes written, and the time spent representing objects as nodes and emitting them.
+        tags: for each tag loaded (including !<dataclass name> tags), the count of nodes, their own time
+            and their cumulative time, including nested nodes.
+        types: the same for each type of object dumped.
+        imports: the time taken to import and look up each FunctionHandle or ClassObject target, by module:name.
+        largest_nodes: the n_largest largest nodes loaded, by size in characters, with their line and tag.
+
+    Times are in seconds. The report only holds numbers, strings, lists and dicts, so it can be written as json.
+    Nothing is instrumented outside of the context, so profiling costs nothing when it is not used.
+    The instance should not be used by other threads while it is profiled.
+
+    example:
+
+        with profile_yaml() as report:
+            params = yaml_load_fname('params.yaml')
+        print(json.dumps(report, indent=2))
+    '''
+    profiler = _Profiler(n_largest)
+    load_report, dump_report = profiler.report['load'], profiler.report['dump']
+    imports = profiler.report['imports']
+    base_load, base_dump = yaml.load, yaml.dump
+    base_resolve_object = interface_classes.resolve_object
+
+    def load(stream, *args, **kwargs):
+        position = _stream_position(stream)
+        start = time.perf_counter()
+        try:
+            return base_load(stream, *args, **kwargs)
+        finally:
+            load_report['calls'] += 1
+            load_report['time'] += time.perf_counter() - start
+            load_report['bytes'] += _stream_bytes(stream, position) or 0
+
+    def dump(data, stream, *args, **kwargs):
+        position = _stream_position(stream)
+        start = time.perf_counter()
+        try:
+            return base_dump(data, stream, *args, **kwargs)
+        finally:
+            dump_report['calls'] += 1
+            dump_report['time'] += time.perf_counter() - start
+            dump_report['bytes'] += _stream_bytes(stream, position) or 0
+
+    def resolve_object(module_name, name):
+        if (module_name, name) in interface_classes._resolved_objects:
+            return base_resolve_object(module_name, name)
+        start = time.perf_counter()
+        try:
+            return base_resolve_object(module_name, name)
+        finally:
+            key = '{}:{}'.format(module_name, name)
+            imports[key] = imports.get(key, 0.) + time.perf_counter() - start
+
+    saved = {name: vars(yaml)[name] for name in ('_constructor', '_representer', '_resolver') if name in vars(yaml)}
+    base_constructor, base_representer = yaml.Constructor, yaml.Representer
+    try:
+        yaml.Constructor = _profiled_constructor(base_constructor, yaml.Resolver.resolve, profiler)
+        yaml.Representer = _profiled_representer(base_representer, profiler)
+        for name in ('_constructor', '_representer'):
+            vars(yaml).pop(name, None)
+        # the pure python loader keeps its resolver apart from the constructor.
+        resolver = yaml.resolver
+        resolver.resolve = lambda *args: _timed_resolve(load_report, type(resolver).resolve, resolver, *args)
+        yaml.load, yaml.dump = load, dump
+        interface_classes.resolve_object = resolve_object
+        yield profiler.report
+    finally:
+        interface_classes.resolve_object = base_resolve_object
+        del yaml.load, yaml.dump
+        vars(yaml.resolver).pop('resolve', None)
+        _keep_registrations(yaml.Constructor, base_constructor, [('yaml_constructors', 'add_constructor'),
+                                                                 ('yaml_multi_constructors', 'add_multi_constructor')])
+        _keep_registrations(yaml.Representer, base_representer, [('yaml_representers', 'add_representer'),
+                                                                  ('yaml_multi_representers', 'add_multi_representer')])
+        yaml.Constructor, yaml.Representer = base_constructor, base_representer
+        for name in ('_constructor', '_representer', '_resolver'):
+            vars(yaml).pop(name, None)
+        vars(yaml).update(saved)
+        profiler.finish()
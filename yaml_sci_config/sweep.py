@@ -0,0 +1,115 @@
+import copy
+import math
+
+import numpy as np
+
+from yaml_sci_config.clone import clone
+from yaml_sci_config.interface_classes import ArrayParams
+
+
+def _array_params(obj, path=()):
+    '''
+    Yields (path, ArrayParams) for every ArrayParams in obj, where path is the keys, indices or attribute names
+        leading to it, through dicts, lists, tuples and dataclasses.
+    '''
+    if isinstance(obj, ArrayParams):
+        yield path, obj
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from _array_params(value, path + (key,))
+    elif isinstance(obj, (list, tuple)):
+        for index, value in enumerate(obj):
+            yield from _array_params(value, path + (index,))
+    elif hasattr(obj, '__dataclass_fields__') and not isinstance(obj, type):
+        for name in obj.__dataclass_fields__:
+            if hasattr(obj, name):
+                yield from _array_params(getattr(obj, name), path + (name,))
+
+
+class Sweep:
+    '''
+    Lazily expands the ArrayParams (e.g. LogspaceParams) found anywhere in a config into one config per point,
+        in which each ArrayParams is replaced by one value of its grid.
+
+    With mode='product' the points are the Cartesian product of the grids, with the last grid varying fastest
+        (as itertools.product). With mode='zip', all grids must have the same length, and point k takes
+        the k-th value of every grid.
+    Points are only built when asked for: the k-th point is found in constant time (sweep[k]), and
+        slicing, shard() and sample() give sweeps over a subset of the points without building any.
+    The parts of the config without ArrayParams are shared between points, rather than copied.
+
+    example:
+
+        sweep = Sweep(params)
+        for params_k in sweep.shard(worker_index, n_workers):
+            run(params_k)
+    '''
+
+    def __init__(self, config, mode='product'):
+        if mode not in ('product', 'zip'):
+            raise ValueError("mode must be 'product' or 'zip', not {!r}".format(mode))
+        self.config = config
+        self.mode = mode
+        found = list(_array_params(config))
+        self.paths = [path for path, _ in found]
+        self.axes = [np.asarray(params.to_np_array()).reshape(-1) for _, params in found]
+        lengths = [len(axis) for axis in self.axes]
+        if mode == 'zip' and len(set(lengths)) > 1:
+            raise ValueError('Zipped grids must have the same length, not {}'.format(lengths))
+        n_points = math.prod(lengths) if mode == 'product' else (lengths[0] if lengths else 1)
+        self.indices = range(n_points)
+
+    def _view(self, indices):
+        view = copy.copy(self)
+        view.indices = indices
+        return view
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return self._view(self.indices[k])
+        return self.point(self.indices[k])
+
+    def __iter__(self):
+        for index in self.indices:
+            yield self.point(index)
+
+    def values(self, index):
+        '''
+        Returns the value of each grid (in the order of self.paths) at point index of the full sweep.
+        '''
+        if self.mode == 'zip':
+            return [axis[index].item() for axis in self.axes]
+        values = []
+        for axis in reversed(self.axes):
+            index, axis_index = divmod(index, len(axis))
+            values.append(axis[axis_index].item())
+        return values[::-1]
+
+    def point(self, index):
+        '''
+        Returns the config at point index of the full sweep (ignoring any slicing, sharding or sampling).
+        '''
+        return clone(self.config, dict(zip(self.paths, self.values(index))))
+
+    def shard(self, shard_index, n_shards):
+        '''
+        Returns the sweep over every n_shards-th point, starting at shard_index, for one of n_shards workers.
+        '''
+        return self._view(self.indices[shard_index::n_shards])
+
+    def sample(self, n_samples, seed=None):
+        '''
+        Returns the sweep over n_samples points chosen at random, without replacement.
+        '''
+        positions = np.random.default_rng(seed).choice(len(self.indices), n_samples, replace=False)
+        return self._view([self.indices[position] for position in positions.tolist()])
+
+    def chunks(self, chunk_size):
+        '''
+        Yields sweeps over consecutive chunks of chunk_size points.
+        '''
+        for start in range(0, len(self.indices), chunk_size):
+            yield self[start:start + chunk_size]
@@ -1,8 +1,28 @@
+import base64
+import hashlib
+import os
 import re
-from dataclasses import _MISSING_TYPE, fields
-from ruamel.yaml.representer import TaggedScalar
+import stat
+import sys
+import tempfile
+import warnings
+from contextlib import contextmanager
+from dataclasses import _FIELD_INITVAR, MISSING, fields
+from functools import partial
+from ruamel.yaml.anchor import Anchor
+from ruamel.yaml.constructor import ConstructorError, RoundTripConstructor, SafeConstructor
+from ruamel.yaml.emitter import RoundTripEmitter, ScalarAnalysis
+from ruamel.yaml.nodes import MappingNode, ScalarNode, SequenceNode
+from ruamel.yaml.resolver import _DEFAULT_YAML_VERSION, VersionedResolver
+from ruamel.yaml.serializer import templated_id
+try:
+    from ruamel.yaml.cyaml import CParser
+except ImportError:  # ruamel.yaml.clib is not installed
+    CParser = None
+from ruamel.yaml.representer import RoundTripRepresenter, SafeRepresenter, TaggedScalar
 
 import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
 #import pinn_gencases.utils.domains_interface import yaml_classes
 
 #import pinn_gencases.utils.domains_interface, pinn_gencases.utils.var_form_interface
@@ -16,58 +36,165 @@ import ruamel.yaml
 from typing import get_type_hints
 
 yaml_preset = ruamel.yaml.YAML(typ='rt')
+# Loads into plain dicts and lists, without the comments and formatting kept by yaml_preset.
+#   Uses the C based loader when ruamel.yaml.clib is installed.
+yaml_fast = ruamel.yaml.YAML(typ='safe')
 
 
-def _complex_re_gen():
+def _complex_re_gen(max_length=100):
     '''
     Because it is complicated, returns a string which parses complex expressions.
     # Gave up and looked for complex number regular expression,
     #   modified to include scientific numbers.
     # See https://web.archive.org/web/20221228150825/https://stackoverflow.com/questions/67818976/regular-expression-for-complex-numbers
+    A real part must be followed by the sign of the imaginary part, so that there is only one way to match
+        a scalar and matching takes linear time. Scalars longer than max_length are rejected up front.
     '''
-    num = r'(?:[+\-]?(?:\d*\.)?\d+)'
+    num = r'(?:\d+(?:\.\d+)?|\.\d+)'
     num_sci = r'(?:{num}(?:e[+\-]?\d+)?)'.format(num=num)
-    cx_num = r'(?:{num_sci}?{num_sci}[ij])'.format(num_sci=num_sci)
-    cx_match_wrapped= r"^(?:{cx_num}|\({cx_num}\))$".format(cx_num=cx_num)
+    cx_num = r'(?:[+\-]?{num_sci}(?:[+\-]{num_sci})?[ij])'.format(num_sci=num_sci)
+    cx_match_wrapped= r"^(?=.{{1,{max_length}}}$)(?:{cx_num}|\({cx_num}\))$".format(cx_num=cx_num,
+                                                                                 max_length=max_length)
     return cx_match_wrapped
 
 
-
-_tuple_re = r"^(?:\((?:.|\n|\r)*,(?:.|\n|\r)*\){1}(?: |\n|\r)*$)"
-_array_re = r"^(?:(np\.|)array\(\[(?:.|\n|\r)*,(?:.|\n|\r)*\]\){1}(?: |\n|\r)*$)"
+# The lookaheads check for a comma without backtracking over the whole scalar, as (?:.|\n|\r)*,(?:.|\n|\r)* did.
+_tuple_re = r"^\((?=[^,]*,)[\s\S]*\)[ \n\r]*$"
+_array_re = r"^(?:np\.|)array\(\[(?=[^,]*,)[\s\S]*\](?:, *dtype=(?:np\.|)\w+)?\)[ \n\r]*$"
 _complex_re= _complex_re_gen()
 
 
-def make_constructor(cls):
+def make_constructor(cls, post_init=True):
+    '''
+    Returns the constructor of yaml nodes tagged with cls.
+    For a dataclass, the fields, defaults and default factories are looked up once here, rather than for every node.
+    Each node then sets every field (from the node, its default or its default factory) and,
+        if post_init is set, runs __post_init__ afterwards, with any InitVar arguments.
+        A class which defines __setstate__ (as for pickling) is given the fields through it instead.
+    '''
+    if not is_dataclass(cls):
+        def constructor(loader: ruamel.yaml.Loader, node):
+            return RoundTripConstructor.construct_yaml_object(loader, node, cls)
+        return constructor
+
+    defaults = {}
+    default_factories = {}
+    required = []
+    for field in fields(cls):
+        if field.default is not MISSING:
+            defaults[field.name] = field.default
+        elif field.default_factory is not MISSING:
+            default_factories[field.name] = field.default_factory
+        else:
+            required.append(field.name)
+    init_var_defaults = {name: field.default for name, field in cls.__dataclass_fields__.items()
+                         if field._field_type is _FIELD_INITVAR}
+    set_state = getattr(cls, '__setstate__', None)
+    if set_state is _slots_setstate:
+        set_state = None  # only there for pickling, see _slotted.
+    run_post_init = getattr(cls, '__post_init__', None) if post_init else None
+    # frozen or slotted instances can't be set through __dict__
+    use_dict = not cls.__dataclass_params__.frozen and not any('__slots__' in vars(base) for base in cls.__mro__)
+
     def constructor(loader: ruamel.yaml.Loader, node):
-        '''
-        Patch to include dataclasses fields with default factory.
-        '''
-        for data in loader.construct_yaml_object(node, cls):
-            yield data
-        # raw = loader.construct_mapping(node,maptyp=CommentedMap, deep=True)
-        # init_kwargs = {}
-        if is_dataclass(cls):
-            # correct for ruamel.yaml not setting default fields with factories
-            for field in fields(cls):
-                try:
-                    getattr(data, field.name)
-                except AttributeError:
-                    if not isinstance(field.default_factory, _MISSING_TYPE):
-                        setattr(data, field.name, field.default_factory())
-                        continue
-                    raise (AttributeError(
-                        'Unset dataclass field for dataclass of type {}: {}'.format(type(data), field.name)))
+        data = cls.__new__(cls)
+        yield data
+        state = None
+        if all(type(key_node) is ScalarNode and key_node.value != '<<' for key_node, _ in node.value):
+            # attribute names as keys, without merge keys to flatten
+            state = {key_node.value: loader.construct_object(value_node, deep=True) for key_node, value_node in node.value}
+        if state is None or len(state) != len(node.value):  # duplicate keys are reported as for any mapping
+            state = SafeConstructor.construct_mapping(loader, node, deep=True)
+        init_vars = {name: state.pop(name, default) for name, default in init_var_defaults.items()}
+        for name, value in init_vars.items():
+            if value is MISSING:
+                raise ConstructorError(None, None, 'Unset InitVar {} of dataclass {}'.format(name, cls.__name__),
+                                       node.start_mark)
+        for name in required:
+            if name not in state:
+                raise AttributeError('Unset dataclass field for dataclass of type {}: {}'.format(cls, name))
+        # fields missing from the node go after those in it, so that dumping keeps the order of the node's keys.
+        for name, default in defaults.items():
+            if name not in state:
+                state[name] = default
+        for name, default_factory in default_factories.items():
+            if name not in state:
+                state[name] = default_factory()
+        if set_state is not None:
+            set_state(data, state)
+        else:
+            if use_dict:
+                data.__dict__.update(state)
+            else:
+                for name, value in state.items():
+                    object.__setattr__(data, name, value)
+            if run_post_init is not None:
+                run_post_init(data, **init_vars)
+        if node.anchor and not templated_id(node.anchor):
+            # keep the anchor for round-trip dumping, as RoundTripConstructor.construct_yaml_object does
+            anchor = getattr(data, Anchor.attrib, None)
+            if anchor is None:
+                anchor = Anchor()
+                object.__setattr__(data, Anchor.attrib, anchor)
+            anchor.value = node.anchor
 
     return constructor
 
 
+_int_literal_re = re.compile(r'^[+\-]?\d+$')
+_float_literal_re = re.compile(r'^[+\-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+\-]?\d+)?$')
+
+
+def _flat_numeric_literal(value):
+    '''
+    Parses the comma separated contents of a flat tuple of ints and floats, e.g. "1, 2.5, -3e4",
+        without going through a YAML parser.
+    Returns None if any element is not a plain number, in which case the contents need to be parsed as YAML.
+    '''
+    parsed = []
+    for elem in value.split(','):
+        elem = elem.strip()
+        if _int_literal_re.match(elem):
+            parsed.append(int(elem))
+        elif _float_literal_re.match(elem):
+            parsed.append(float(elem))
+        else:
+            return None
+    return parsed
+
+
+def _loading_yaml(constructor):
+    '''
+    Returns the YAML instance which a constructor loads for.
+    Through the C based parser, ruamel.yaml sets the constructor's loader to a combined parser and constructor object
+        instead, so setup_yaml stores the YAML instance on the constructor class as well.
+    '''
+    return getattr(constructor, 'yaml_instance', None) or getattr(constructor, 'loader', None)
+
+
+def _safe_sub_yaml(constructor):
+    '''
+    Returns the safe YAML instance which parses the contents of !tuple and !nparray scalars.
+    It is created once and cached on the YAML instance doing the loading, instead of being created for each node.
+    Tags nested in the sub-parser's input use the sub-parser's own cached sub-parser, as a YAML instance can't load
+        re-entrantly.
+    '''
+    parent = _loading_yaml(constructor)
+    sub_yaml = getattr(parent, '_safe_sub_yaml', None)
+    if sub_yaml is None:
+        sub_yaml = ruamel.yaml.YAML(typ='safe')
+        setup_yaml(sub_yaml, custom_types)
+        if parent is not None:
+            parent._safe_sub_yaml = sub_yaml
+    return sub_yaml
 
 
 def _tuple_constructor_safe(self,node):
-    yaml = ruamel.yaml.YAML(typ='safe')
-    setup_yaml(yaml,custom_types)
     value = node.value
+    flat = _flat_numeric_literal(value.strip()[1:-1])
+    if flat is not None:
+        return tuple(flat)
+    yaml = _safe_sub_yaml(self)
     value = re.sub("^\(","[",value)
     value = re.sub("\)$","]",value)
     #value = 'placeholder: '+value
@@ -79,16 +206,119 @@ def _complex_constructor(self,node):
     return complex(node.value.replace(' ', '').replace('i','j'))
 
 
-def _array_constructor_safe(self,node):
-    yaml = ruamel.yaml.YAML(typ='safe')
-    setup_yaml(yaml,custom_types)
-    value = node.value
-    value = re.sub("^(?:np\.|)array\(","",value)
-    value = re.sub("\)$","",value)
+_array_literal_re = re.compile(
+    r'^\s*(?:np\.|)array\((?P<body>.*?)\s*(?:,\s*dtype\s*=\s*(?:np\.|)(?P<dtype>\w+)\s*)?\)\s*$', re.DOTALL)
+_array_skeleton_re = re.compile(r'[^\[\],]+')
+# an empty list or element, which np.fromstring would read as a number.
+_array_empty_item_re = re.compile(r'[\[,]\s*[\],]')
+# an integer which may not fit in an int64, which np.fromstring would saturate.
+_array_long_int_re = re.compile(r'\d{19}')
+_array_complex_re = re.compile(r'[\d.nf][ij]')
+_array_float_re = re.compile(r'[.eEnN]')
+
+
+def _bracket_skeleton(shape):
+    '''
+    Returns the brackets and commas of a nested list literal of the given shape, e.g. '[[,,],[,,]]' for shape (2, 3).
+    '''
+    skeleton = '[' + ',' * (shape[-1] - 1) + ']'
+    for n in reversed(shape[:-1]):
+        skeleton = '[' + ','.join([skeleton] * n) + ']'
+    return skeleton
+
+
+def _array_shape_from_brackets(skeleton):
+    '''
+    Infers the shape of a nested list literal from its skeleton (see _bracket_skeleton).
+    The shape is read off the first list at each nesting depth, then checked against the whole skeleton.
+    Returns None if the nesting is ragged.
+    '''
+    ndim = len(skeleton) - len(skeleton.lstrip('['))
+    chars = np.frombuffer(skeleton.encode('ascii'), dtype=np.uint8)
+    depth = np.cumsum((chars == ord('[')).astype(np.int64) - (chars == ord(']')))
+    shape = []
+    for d in range(1, ndim + 1):
+        # the first list at depth d opens at index d-1, and closes where the depth first drops below d.
+        end = d - 1 + int(np.argmax(depth[d - 1:] < d))
+        commas = (chars[d - 1:end] == ord(',')) & (depth[d - 1:end] == d)
+        shape.append(int(np.count_nonzero(commas)) + 1)
+    if not shape or _bracket_skeleton(shape) != skeleton:
+        return None
+    return tuple(shape)
+
+
+def _array_literal_fast(body, dtype=None):
+    '''
+    Parses the nested list in a np.array([...]) literal straight into a numpy array of ints, floats or complex numbers,
+        without creating a Python object per element.
+    The shape is inferred from the brackets, the numbers are converted in bulk by np.fromstring.
+    If no dtype is given, it is inferred like np.array would: complex if any element is complex,
+        float if any element is a float, int otherwise.
+    Returns None if the list is ragged, empty or does not only contain numbers.
+    '''
+    if _array_empty_item_re.search(body):
+        return None
+    shape = _array_shape_from_brackets(_array_skeleton_re.sub('', body))
+    if shape is None:
+        return None
+    if dtype is None:
+        if _array_complex_re.search(body):
+            dtype = np.dtype(complex)
+        elif _array_float_re.search(body):
+            dtype = np.dtype(float)
+        else:
+            dtype = np.dtype(int)
+    elif dtype.kind not in 'iufc':
+        return None
+    if dtype.kind in 'iu' and _array_long_int_re.search(body):
+        return None
+    values = body.replace('[', ' ').replace(']', ' ')
+    if dtype.kind == 'c':
+        values = values.replace('i', 'j').replace('jnf', 'inf')
+    with warnings.catch_warnings():
+        # np.fromstring warns instead of raising when it can't parse an element.
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            # integers are read as int64 and checked against the range of dtype, as np.fromstring wraps them.
+            data = np.fromstring(values, dtype=np.int64 if dtype.kind in 'iu' else dtype, sep=',')
+        except (DeprecationWarning, ValueError):
+            return None
+    if data.size != np.prod(shape):
+        return None
+    if dtype.kind in 'iu' and data.dtype != dtype:
+        info = np.iinfo(dtype)
+        if data.min() < info.min or data.max() > info.max:
+            return None
+        data = data.astype(dtype)
+    return data.reshape(shape)
+
+
+def _parse_array_text(text, constructor=None):
+    '''
+    Parses the text of an !nparray scalar. Ragged or non-numeric arrays are parsed by the safe sub-parser cached
+        on the YAML instance of constructor, or by a new one without it (as for LazyArray, which keeps only the text).
+    '''
+    match = _array_literal_re.match(text)
+    if match is None:
+        raise ValueError('Could not parse numpy array: {}'.format(text))
+    value = match.group('body')
+    dtype = None if match.group('dtype') is None else np.dtype(match.group('dtype'))
+    data = _array_literal_fast(value, dtype)
+    if data is not None:
+        return data
+    # ragged or non-numeric arrays are parsed as YAML lists.
+    yaml = _safe_sub_yaml(constructor)
     #value = value.replace(',',', ')
     #value = re.sub(" +"," ",value)
     safe_l = yaml.load(value)
-    return np.array(safe_l)
+    return np.array(safe_l, dtype=dtype)
+
+
+def _array_constructor_safe(self,node):
+    storage = getattr(_loading_yaml(self), 'array_storage', None)
+    if storage is not None and storage.lazy:
+        return LazyArray(partial(_parse_array_text, node.value))
+    return _parse_array_text(node.value, self)
 
 
 def _tuple_representer(dumper, data):
@@ -102,14 +332,280 @@ def _complex_representer(dumper,data):
     return dumper.represent_tagged_scalar(TaggedScalar(repr, style=None, tag='!complex'))
 
 
+# dtypes which np.array infers from the text of an array, and so aren't written out.
+_inferred_dtypes = (np.dtype(int), np.dtype(float), np.dtype(complex), np.dtype(bool))
+
+
+def _array_dtype_suffix(data):
+    # np.array infers float for an empty list. Only numeric dtypes are written, as names such as datetime64[D]
+    #   are not plain scalars.
+    if data.dtype.kind not in 'biufc' or (data.dtype in _inferred_dtypes and (data.size > 0 or data.dtype == float)):
+        return ''
+    return ', dtype={}'.format(data.dtype.name)
+
+
+# number of elements formatted to text at a time.
+_array_chunk_size = 2**16
+
+
+def _array_text_chunks(data):
+    '''
+    Yields the text of the nested list of a numeric array, e.g. '[[1.5, 2.0], [3.0, 4.0]]', a chunk of elements at a time.
+    Numbers are written with numpy's shortest representation which round-trips exactly.
+    Only one chunk of elements is converted to Python strings at a time, and no intermediate copies of the full
+        text are made.
+    '''
+    shape = data.shape
+    # an element at a flat index divisible by block_sizes[d] opens (or, for the last element, closes) a list at depth d.
+    block_sizes = [int(np.prod(shape[d:])) for d in range(data.ndim)]
+    flat = data.reshape(-1)
+    for start in range(0, flat.size, _array_chunk_size):
+        strs = flat[start:start + _array_chunk_size].astype(str).tolist()
+        for i in range(-start % shape[-1], len(strs), shape[-1]):
+            strs[i] = '[' * sum((start + i) % size == 0 for size in block_sizes) + strs[i]
+        for i in range(-(start + 1) % shape[-1], len(strs), shape[-1]):
+            strs[i] = strs[i] + ']' * sum((start + i + 1) % size == 0 for size in block_sizes)
+        text = ', '.join(strs)
+        if data.dtype.kind == 'c':
+            text = text.replace('(', '').replace(')', '')
+        yield text if start == 0 else ', ' + text
+
+
 def _array_representer(dumper, data):
-    repr = 'np.array(' + np.array2string(data, max_line_width=np.inf, precision=16, #prefix='np.array(',
-                                         separator=', ', #suffix=')'
-                                         ) + ')'
-    repr = repr.replace(' ', '').replace(',', ', ')
+    data = np.asarray(data)  # e.g. an np.memmap
+    storage = getattr(dumper.dumper, 'array_storage', None)
+    if storage is not None and storage.in_sidecar(data):
+        return _array_file_representer(dumper, data, storage)
+    if storage is not None and storage.in_b64(data):
+        return _array_b64_representer(dumper, data)
+    if data.dtype.kind in 'biufc' and data.ndim > 0 and data.size > 0:
+        repr = ''.join(['np.array(', *_array_text_chunks(data), _array_dtype_suffix(data), ')'])
+    elif data.ndim > 0 and data.size == 0:
+        # nested empty lists, e.g. [[], []] for shape (2, 0), which array2string writes as [].
+        repr = 'np.array({}{})'.format(data.tolist(), _array_dtype_suffix(data))
+    else:
+        repr = 'np.array(' + np.array2string(data, max_line_width=np.inf, precision=16, #prefix='np.array(',
+                                             separator=', ', threshold=sys.maxsize, #suffix=')'
+                                             ) + _array_dtype_suffix(data) + ')'
+        repr = repr.replace(' ', '').replace(',', ', ')
     return dumper.represent_tagged_scalar(TaggedScalar(repr, style=None, tag='!nparray'))
 
 
+def _array_b64_representer(dumper, data):
+    '''
+    Represents the array inline by its raw bytes, base64 encoded.
+    '''
+    raw = base64.b64encode(np.ascontiguousarray(data).reshape(-1).view(np.uint8)).decode('ascii')
+    return dumper.represent_mapping('!nparray_b64', {'dtype': data.dtype.str, 'shape': tuple(data.shape), 'data': raw})
+
+
+def _array_b64_constructor(self, node):
+    ref = {self.construct_scalar(key): self.construct_object(value, deep=True) for key, value in node.value}
+    raw = bytearray(base64.b64decode(ref['data']))
+    return np.frombuffer(raw, dtype=np.dtype(ref['dtype'])).reshape(tuple(ref['shape']))
+
+
+def _array_checksum(data):
+    return hashlib.sha256(np.ascontiguousarray(data).reshape(-1).view(np.uint8)).hexdigest()
+
+
+def _umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# mode of new files, as open() would create them. The umask is read once, as reading it means setting it.
+_new_file_mode = 0o666 & ~_umask()
+
+
+def _write_atomic(path, write):
+    '''
+    Writes the file path with write(file object).
+    It is written to a temporary file first, so that concurrent writers and readers never see a partly written file.
+    The file keeps the mode of the file it replaces, or gets the mode open() would give a new file,
+        rather than the private mode of the temporary file.
+    '''
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = _new_file_mode
+    fd, tmp_path = tempfile.mkstemp(dir=directory or None, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fout:
+            write(fout)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _write_once(path, write, pending=None):
+    '''
+    Writes a file named by the checksum of its contents with write(file object), unless it already exists.
+    If a list pending is given, (path, write) is added to it instead, to be written later.
+    '''
+    if pending is not None:
+        pending.append((path, write))
+    elif not os.path.exists(path):
+        _write_atomic(path, write)
+
+
+def _array_file_representer(dumper, data, storage):
+    '''
+    Writes the array to a .npy file in the sidecar directory and represents it by a reference to that file.
+    Files are named by their checksum, so an array which is saved twice is only written once.
+    '''
+    checksum = _array_checksum(data)
+    fname = '{}{}.npy'.format(storage.prefix, checksum[:16])
+    path = os.path.join(storage.directory, fname)
+    if storage.pending is not None:
+        data = np.array(data)  # a copy, so that changes made before it is written are not saved.
+    _write_once(path, partial(np.save, arr=data, allow_pickle=False), storage.pending)
+    ref = {'path': fname, 'dtype': data.dtype.str, 'shape': tuple(data.shape), 'sha256': checksum}
+    return dumper.represent_mapping('!nparray_file', ref)
+
+
+def _load_array_file(path, ref, storage):
+    data = np.load(path, mmap_mode=storage.mmap_mode, allow_pickle=False)
+    if data.dtype != np.dtype(ref['dtype']) or data.shape != tuple(ref['shape']):
+        raise ValueError('Sidecar array {} does not match its reference: expected dtype {} and shape {}, '
+                         'found dtype {} and shape {}'.format(path, ref['dtype'], tuple(ref['shape']),
+                                                              data.dtype.str, data.shape))
+    if storage.verify and 'sha256' in ref and _array_checksum(data) != ref['sha256']:
+        raise ValueError('Checksum of sidecar array {} does not match its reference.'.format(path))
+    return data
+
+
+def _array_file_constructor(self, node):
+    '''
+    Loads an array stored in a sidecar .npy file. Relative paths are resolved relative to the storage directory,
+        which yaml_load_fname sets to the directory of the YAML file.
+    '''
+    ref = {self.construct_scalar(key): self.construct_object(value, deep=True) for key, value in node.value}
+    storage = getattr(_loading_yaml(self), 'array_storage', None) or ArrayStorageOptions()
+    path = os.path.join(storage.directory, ref['path'])
+    if storage.lazy:
+        return LazyArray(partial(_load_array_file, path, ref, storage))
+    return _load_array_file(path, ref, storage)
+
+
+@dataclass
+class SnapshotRef:
+    '''
+    Reference to part of a config which is saved in a file of its own, named by the sha256 checksum of its contents
+        (see load_save.yaml_save_snapshot). It is written as a !snapshot mapping, and loaded as the part it refers to.
+    '''
+    path: str
+    sha256: str
+
+
+def _snapshot_representer(dumper, data):
+    return dumper.represent_mapping('!snapshot', {'path': data.path, 'sha256': data.sha256})
+
+
+def _yaml_like(base):
+    '''
+    Returns a new YAML instance set up as base, including its registered yaml_dataclass classes.
+    '''
+    yaml = ruamel.yaml.YAML(typ=base.typ, pure=base.pure)
+    yaml.Constructor, yaml.Representer = base.Constructor, base.Representer
+    setup_yaml(yaml, custom_types)
+    return yaml
+
+
+def _snapshot_constructor(self, node):
+    '''
+    Loads the part of a config a !snapshot refers to, relative to the storage directory, as for sidecar arrays.
+    It is loaded by a YAML instance set up as the one loading the config, which is cached on that instance.
+    '''
+    ref = {self.construct_scalar(key): self.construct_object(value, deep=True) for key, value in node.value}
+    parent = _loading_yaml(self) or yaml_preset
+    storage = getattr(parent, 'array_storage', None) or ArrayStorageOptions()
+    path = os.path.join(storage.directory, ref['path'])
+    with open(path, 'rb') as filep:
+        text = filep.read()
+    if storage.verify and hashlib.sha256(text).hexdigest() != ref['sha256']:
+        raise ValueError('Checksum of snapshot {} does not match its reference.'.format(path))
+    sub_yaml = getattr(parent, '_snapshot_sub_yaml', None)
+    if sub_yaml is None:
+        sub_yaml = parent._snapshot_sub_yaml = _yaml_like(parent)
+    with array_storage(sub_yaml, **vars(storage)):
+        return sub_yaml.load(text.decode())
+
+
+class LazyArray(NDArrayOperatorsMixin):
+    '''
+    Placeholder for a numpy array, which is only parsed (or loaded from its sidecar file) when it is first used.
+    Loading with ArrayStorageOptions.lazy set gives these instead of arrays, so that arrays a program never touches
+        cost next to nothing.
+
+    The array is parsed once, on first use through np.asarray (the __array__ protocol), arithmetic, numpy functions,
+        indexing or any ndarray attribute, and cached afterwards.
+    Note that a LazyArray is not an instance of np.ndarray; use np.asarray(x) or x.materialize() where one is needed.
+    '''
+
+    def __init__(self, parse):
+        self._parse = parse
+        self._array = None
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._array is not None
+
+    def materialize(self) -> np.ndarray:
+        if self._array is None:
+            self._array = self._parse()
+            self._parse = None
+        return self._array
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.materialize()
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = tuple(x.materialize() if isinstance(x, LazyArray) else x for x in inputs)
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        args = tuple(x.materialize() if isinstance(x, LazyArray) else x for x in args)
+        return func(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    def __getitem__(self, item):
+        return self.materialize()[item]
+
+    def __setitem__(self, item, value):
+        self.materialize()[item] = value
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __reduce__(self):
+        # pickled and deep copied as the text or file it is parsed from, or as the array once it is.
+        return type(self), (self._parse,), {'_array': self._array}
+
+    def __repr__(self):
+        if self._array is None:
+            return 'LazyArray(<not loaded>)'
+        return 'LazyArray({!r})'.format(self._array)
+
+
+def _lazy_array_representer(dumper, data):
+    return _array_representer(dumper, data.materialize())
+
+
 def _complex_resolver(str_resolve,match_re = re.compile(r'[ij]')):
     '''
     For debugging. Sees if the complex constructor allows it.
@@ -122,22 +618,427 @@ def _complex_resolver(str_resolve,match_re = re.compile(r'[ij]')):
             pass
     return None
 
+
+class RecordColumns:
+    '''
+    A list of records of one yaml_dataclass class, kept as one numpy array per field (a struct of arrays)
+        instead of one object per record, as loaded within columnar_records.
+    Fields of bools, ints, floats, complex numbers or strings get arrays of that type (ints mixed with floats
+        a float array), any other an object array.
+
+    columns['name'] is the array of a field, and columns[i] the i-th record, built as cls(**fields) when asked for.
+    len(), iteration and slicing work as for the list of records, which is also what is dumped.
+    '''
+
+    def __init__(self, cls, columns, length):
+        self.cls = cls
+        self.columns = columns
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def row(self, index):
+        '''
+        Returns the fields of record index as a dict.
+        '''
+        return {name: _column_item(column[index]) for name, column in self.columns.items()}
+
+    def __getitem__(self, index):
+        if isinstance(index, str):
+            return self.columns[index]
+        if isinstance(index, slice):
+            return RecordColumns(self.cls, {name: column[index] for name, column in self.columns.items()},
+                                 len(range(self.length)[index]))
+        return self.cls(**self.row(range(self.length)[index]))
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, RecordColumns):
+            return NotImplemented
+        return (self.cls is other.cls and self.length == other.length and self.columns.keys() == other.columns.keys()
+                and all(np.array_equal(column, other.columns[name]) for name, column in self.columns.items()))
+
+    def __repr__(self):
+        return '{}({}, {} records, fields {})'.format(
+            type(self).__name__, self.cls.__name__, self.length, list(self.columns))
+
+
+def _identity(value):
+    return value
+
+
+def _column_item(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+_seq_tag = 'tag:yaml.org,2002:seq'
+_float_tag = 'tag:yaml.org,2002:float'
+# scalar tags whose values are parsed by numpy for a whole column at once.
+_column_tags = {_float_tag, 'tag:yaml.org,2002:int'}
+
+
+def _column(loader, value_nodes, default=None):
+    '''
+    Returns the array of the values of value_nodes, where a missing value (None) is given by calling default().
+    A column of ints and floats, as hand written for a float field (x: 1 and x: 1.5), is a float column.
+    '''
+    tags = {str(value_node.tag) for value_node in value_nodes if value_node is not None}
+    if default is None and tags and tags <= _column_tags:
+        dtype = np.float64 if _float_tag in tags else np.int64
+        try:
+            return np.array([value_node.value for value_node in value_nodes]).astype(dtype)
+        except (ValueError, OverflowError):
+            pass  # e.g. .inf, 0x1f or 1_000, which only the yaml constructors parse.
+    values = [default() if value_node is None else loader.construct_object(value_node, deep=True)
+              for value_node in value_nodes]
+    kinds = {type(value) for value in values}
+    # round-trip loads give float subclasses, such as ScalarFloat.
+    if any(issubclass(kind, float) for kind in kinds) \
+            and all(issubclass(kind, (int, float)) and not issubclass(kind, bool) for kind in kinds):
+        return np.array(values, dtype=np.float64)
+    if len(kinds) == 1 and kinds <= {bool, int, float, complex, str}:
+        return np.array(values)
+    column = np.empty(len(values), dtype=object)
+    for index, value in enumerate(values):
+        column[index] = value
+    return column
+
+
+def _columnar_class(cls):
+    '''
+    Whether records of cls can be kept as columns: rows are built as cls(**fields), so every field has to be an
+        __init__ argument, and the class must not check or set anything in __post_init__ (which would only run
+        when a row is asked for, rather than when the records are loaded) or __setstate__.
+    '''
+    set_state = getattr(cls, '__setstate__', None)
+    return (getattr(cls, '__post_init__', None) is None and set_state in (None, _slots_setstate)
+            and all(field.init for field in fields(cls))
+            and not any(field._field_type is _FIELD_INITVAR for field in cls.__dataclass_fields__.values()))
+
+
+def _record_columns(loader, node, min_length):
+    '''
+    Returns the sequence node as RecordColumns, if it has at least min_length items, all of them mappings with
+        the tag of the same yaml_dataclass class (which _columnar_class allows) and only scalar field values.
+        Returns None otherwise.
+    '''
+    items = node.value
+    if len(items) < min_length or not items or not isinstance(items[0], MappingNode):
+        return None
+    tag = str(items[0].tag)
+    cls = yaml_classes.get(tag)
+    if cls is None or not _columnar_class(cls):
+        return None
+    record_fields = {field.name: field for field in fields(cls)}
+    defaults = {name: field.default_factory for name, field in record_fields.items()
+                if field.default_factory is not MISSING}
+    defaults.update({name: partial(_identity, field.default) for name, field in record_fields.items()
+                     if field.default is not MISSING})
+    value_nodes = {name: [] for name in record_fields}
+    for index, item in enumerate(items):
+        if not isinstance(item, MappingNode) or str(item.tag) != tag or item.anchor is not None \
+                or len(item.value) > len(record_fields):
+            return None
+        for key_node, value_node in item.value:
+            column = value_nodes.get(key_node.value) if type(key_node) is ScalarNode else None
+            if column is None or type(value_node) is not ScalarNode or len(column) != index:
+                return None
+            column.append(value_node)
+        for name, column in value_nodes.items():
+            if len(column) == index:
+                if name not in defaults:
+                    return None  # a missing field is reported when the records are constructed.
+                column.append(None)
+    columns = {name: _column(loader, column_nodes, defaults.get(name) if None in column_nodes else None)
+               for name, column_nodes in value_nodes.items()}
+    return RecordColumns(cls, columns, len(items))
+
+
+def _columnar_seq_constructor(base):
+    '''
+    Wraps the sequence constructor base, such that within columnar_records sequences of records load as RecordColumns.
+    '''
+    def constructor(self, node):
+        parent = _loading_yaml(self)
+        min_length = getattr(parent, 'columnar_min_length', None)
+        if min_length is not None:
+            columns = _record_columns(self, node, min_length)
+            if columns is not None:
+                return columns
+        return base(self, node)
+
+    constructor.columnar_base = base
+    return constructor
+
+
+def _record_columns_representer(dumper, data):
+    tag = '!' + data.cls.__name__
+    nodes = []
+    for index in range(len(data)):
+        dumper.alias_key = None  # rows are built here, so they can't be aliased.
+        nodes.append(dumper.represent_mapping(tag, data.row(index)))
+    return SequenceNode(_seq_tag, nodes, flow_style=False)
+
+
+# 'first' lists every character a matching scalar can start with. ruamel.yaml tries resolvers registered with
+#   first=None against every plain scalar, and grows its resolver lists while doing so, so avoid None.
 custom_types = {
     '!tuple':   {'re':_tuple_re,   'constructor': _tuple_constructor_safe, 'representer': _tuple_representer, 'type': tuple, 'first':list('(')},
     '!nparray': {'re':_array_re,   'constructor': _array_constructor_safe, 'representer': _array_representer, 'type': np.ndarray, 'first':list('an')},
-    '!complex': {'re':_complex_re,   'constructor': _complex_constructor, 'representer': _complex_representer, 'type': complex, 'first':None}
+    '!complex': {'re':_complex_re,   'constructor': _complex_constructor, 'representer': _complex_representer, 'type': complex, 'first':list('0123456789+-.(')}
+}
+
+# tags which are only ever written explicitly, and so have no implicit resolver or representer of their own.
+custom_constructors = {
+    '!nparray_file': _array_file_constructor,
+    '!nparray_b64': _array_b64_constructor,
+    '!snapshot': _snapshot_constructor,
 }
 
+# types which are written as one of the custom tags above, but aren't their native type.
+custom_representers = {
+    LazyArray: _lazy_array_representer,
+    SnapshotRef: _snapshot_representer,
+    RecordColumns: _record_columns_representer,
+}
+# representers of the types and their subclasses, such as the np.memmap arrays loaded with mmap_mode.
+custom_multi_representers = {
+    np.ndarray: _array_representer,
+}
+
+
+@dataclass
+class ArrayStorageOptions:
+    '''
+    Settings for how large numpy arrays are stored, instead of as inline text.
+
+    Arrays can be stored in binary .npy "sidecar" files next to the YAML file.
+    The YAML file then contains a small !nparray_file reference (path, dtype, shape, sha256 checksum) to each array.
+    Arrays which must stay inline can instead be stored as !nparray_b64, their raw bytes encoded in base64.
+
+    :param sidecar_threshold: (int) arrays with more elements than this are written to a sidecar file.
+      None means arrays are never written to sidecar files.
+    :param b64_threshold: (int) arrays with more elements than this, which are not written to a sidecar file,
+      are written inline as base64. None means arrays are written as text.
+    :param directory: (str) directory where sidecar files are written, and relative to which they are loaded.
+    :param prefix: (str) prefix of the sidecar file names. Usually the name of the YAML file.
+    :param mmap_mode: (str) passed on to np.load. Use 'r' to memory-map loaded arrays read-only.
+    :param verify: (bool) whether to check the checksum of a sidecar array when it is loaded.
+    :param lazy: (bool) load arrays as LazyArray placeholders, which are only parsed when first used.
+    :param pending: (list) if given, sidecar files are not written when dumping, but added to this list
+      as (path, write) pairs, to be written later (see load_save.save_config_async). Arrays are copied when added.
+    '''
+    sidecar_threshold: int = None
+    b64_threshold: int = None
+    directory: str = ''
+    prefix: str = ''
+    mmap_mode: str = None
+    verify: bool = True
+    lazy: bool = False
+    pending: list = None
+
+    def in_sidecar(self, data) -> bool:
+        return self.sidecar_threshold is not None and data.size > self.sidecar_threshold and not data.dtype.hasobject
+
+    def in_b64(self, data) -> bool:
+        return self.b64_threshold is not None and data.size > self.b64_threshold and not data.dtype.hasobject
+
+
+@contextmanager
+def array_storage(yaml, **storage_kwargs):
+    '''
+    Context manager which sets how large arrays are stored (see ArrayStorageOptions) for the given YAML instance.
+
+    example:
+
+        with array_storage(yaml_preset, sidecar_threshold=10**5, directory='out', prefix='run_'):
+            yaml_preset.dump(params, fout)
+    '''
+    previous = getattr(yaml, 'array_storage', None)
+    yaml.array_storage = ArrayStorageOptions(**storage_kwargs)
+    try:
+        yield yaml.array_storage
+    finally:
+        yaml.array_storage = previous
+
+
+@contextmanager
+def columnar_records(yaml, min_length=1):
+    '''
+    Context manager within which the given YAML instance loads sequences of at least min_length records of one
+        yaml_dataclass class, whose fields are all scalars, as RecordColumns: an array per field,
+        rather than an object per record. Other sequences, and those of classes with a __post_init__ or fields
+        which are not __init__ arguments, load as usual. min_length None turns it off.
+
+    example:
+
+        with columnar_records(yaml_fast):
+            sources = yaml_fast.load(fin)['sources']
+        positions = sources['position']
+    '''
+    previous = getattr(yaml, 'columnar_min_length', None)
+    yaml.columnar_min_length = min_length
+    try:
+        yield
+    finally:
+        yaml.columnar_min_length = previous
+
+
+# long scalars written by _array_representer and _array_b64_representer.
+_long_array_scalar_re = re.compile(r'np\.array\([\w.,+\-\[\] =]*\)|[A-Za-z0-9+/]+=*')
+
+
+class ScientificEmitter(RoundTripEmitter):
+    '''
+    Round-trip emitter which writes the long scalars of inline arrays to the stream in one piece.
+    ruamel.yaml analyses and writes plain scalars a character at a time, which dominates the time to dump large arrays.
+    Array text and base64 data are a single line without characters that need quoting, so they are written unchanged.
+    '''
+    fast_scalar_length = 1024
+
+    def _is_long_array_scalar(self, scalar):
+        return len(scalar) > self.fast_scalar_length and _long_array_scalar_re.fullmatch(scalar) is not None
+
+    def analyze_scalar(self, scalar):
+        if self._is_long_array_scalar(scalar):
+            return ScalarAnalysis(scalar=scalar, empty=False, multiline=False, allow_flow_plain=False,
+                                  allow_block_plain=True, allow_single_quoted=True, allow_double_quoted=True,
+                                  allow_block=True)
+        return super().analyze_scalar(scalar)
+
+    def write_plain(self, text, split=True):
+        if self.root_context or not self._is_long_array_scalar(text):
+            return super().write_plain(text, split)
+        if not self.whitespace:
+            text = ' ' + text
+        self.whitespace = False
+        self.indention = False
+        self.column += len(text)
+        if self.encoding:
+            text = text.encode(self.encoding)
+        self.stream.write(text)
+
+
+class ScientificResolver(VersionedResolver):
+    '''
+    Resolver which remembers the tag of each short plain scalar it resolved.
+    Configs repeat many scalars (keys, names, small numbers), each of which is otherwise matched against
+        every implicit resolver registered for its first character.
+    '''
+    cache_size = 2**12
+    cached_length = 256  # longer scalars are rarely repeated, and would be kept alive by the cache.
+    # counts the calls of add_implicit_resolver, after which resolvers forget the tags they found before.
+    _resolvers_added = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._scalar_tags = {}
+        self._resolvers_seen = ScientificResolver._resolvers_added
+
+    @classmethod
+    def add_implicit_resolver(cls, tag, regexp, first):
+        super().add_implicit_resolver(tag, regexp, first)
+        ScientificResolver._resolvers_added += 1
+
+    def resolve(self, kind, value, implicit):
+        if self._resolvers_seen != ScientificResolver._resolvers_added:
+            self._resolvers_seen = ScientificResolver._resolvers_added
+            self._scalar_tags.clear()
+            # VersionedResolver builds its resolvers for each version once, from those added so far.
+            self._version_implicit_resolver.clear()
+        if kind is not ScalarNode or not implicit[0] or len(value) > self.cached_length or self.yaml_path_resolvers:
+            return super().resolve(kind, value, implicit)
+        key = (self.processing_version, value)
+        tag = self._scalar_tags.get(key)
+        if tag is None:
+            if len(self._scalar_tags) >= self.cache_size:
+                self._scalar_tags.clear()
+            tag = self._scalar_tags[key] = super().resolve(kind, value, implicit)
+        return tag
+
+    @property
+    def processing_version(self):
+        # as VersionedResolver.processing_version, which is looked up for every scalar. It finds the version by
+        #   raising and catching AttributeError, twice per scalar through the C based loader.
+        loadumper = self.loadumper
+        version = getattr(getattr(loadumper, '_scanner', None), 'yaml_version', MISSING)
+        if version is MISSING:
+            if hasattr(loadumper, 'typ'):
+                version = getattr(loadumper, 'version', None)
+            else:
+                version = getattr(getattr(loadumper, '_serializer', None), 'use_version', None)  # dumping
+        if version is None:
+            version = self._loader_version
+            if version is None:
+                version = _DEFAULT_YAML_VERSION
+        return version
+
+
+class ScientificSafeConstructor(SafeConstructor):
+    '''
+    Constructor of the safe YAML instances set up by setup_yaml, such as yaml_fast.
+    The custom tags and yaml_dataclass classes are registered on it, rather than on ruamel.yaml's SafeConstructor,
+        which every other safe YAML instance in the process uses.
+    '''
+
+
+class ScientificSafeRepresenter(SafeRepresenter):
+    '''
+    Representer of the safe YAML instances set up by setup_yaml, as ScientificSafeConstructor.
+    It can represent the TaggedScalar nodes of the custom types, as the round-trip representer does.
+    '''
+    represent_tagged_scalar = RoundTripRepresenter.represent_tagged_scalar
+
+
+def yaml_add_custom_constructors(yaml,custom_constructors):
+    for tag,constructor in custom_constructors.items():
+        yaml.Constructor.add_constructor(tag, constructor)
+
+
+def yaml_add_custom_representers(yaml,custom_representers):
+    for data_type,representer in custom_representers.items():
+        yaml.Representer.add_representer(data_type, representer)
+    for data_type,representer in custom_multi_representers.items():
+        yaml.Representer.add_multi_representer(data_type, representer)
+
+
+def _has_implicit_resolver(resolver_cls, tag, first):
+    return any(resolver_tag == tag
+               for ch in (first or [None])
+               for resolver_tag, _ in resolver_cls.yaml_implicit_resolvers.get(ch, []))
+
+
 def yaml_add_custom_types(yaml,custom_types):
     for tag,ct in custom_types.items():
             yaml.Constructor.add_constructor(tag, ct['constructor'])
-            yaml.Resolver.add_implicit_resolver(tag, ruamel.yaml.util.RegExp(ct['re']), ct['first'])
+            # resolvers are stored on the class and appended to on every call, so only register them once.
+            if not _has_implicit_resolver(yaml.Resolver, tag, ct['first']):
+                yaml.Resolver.add_implicit_resolver(tag, ruamel.yaml.util.RegExp(ct['re']), ct['first'])
             yaml.Representer.add_representer(ct['type'], ct['representer'])
 
 
 def setup_yaml(yaml,custom_types):
     #register_yaml_classes(yaml, classes_register)
+    if yaml.Resolver is VersionedResolver:
+        yaml.Resolver = ScientificResolver
+    if yaml.Constructor is SafeConstructor:
+        yaml.Constructor = ScientificSafeConstructor
+    if yaml.Representer is SafeRepresenter:
+        yaml.Representer = ScientificSafeRepresenter
+    if CParser is not None and yaml.Parser is CParser and vars(yaml.Constructor).get('yaml_instance') is not yaml:
+        yaml.Constructor = type(yaml.Constructor.__name__, (yaml.Constructor,), {'yaml_instance': yaml})
     yaml_add_custom_types(yaml,custom_types)
+    yaml_add_custom_constructors(yaml,custom_constructors)
+    yaml_add_custom_representers(yaml,custom_representers)
+    seq_constructor = yaml.Constructor.yaml_constructors.get(_seq_tag)
+    if seq_constructor is not None and not hasattr(seq_constructor, 'columnar_base'):
+        yaml.Constructor.add_constructor(_seq_tag, _columnar_seq_constructor(seq_constructor))
+    if yaml.Emitter is RoundTripEmitter:
+        yaml.Emitter = ScientificEmitter
     #yaml.default_flow_style = False
 
 
@@ -148,13 +1049,77 @@ def register_yaml_classes(yaml,classes_register):
        yaml.register_class(class_reg)
 
 
-def yaml_dataclass(cls=None, yaml=yaml_preset, **dataclass_kwargs):
+# classes registered with yaml_dataclass, by their tag.
+yaml_classes = {}
+
+
+def _slots_getstate(self):
+    state = {}
+    for name in type(self).__state_slots__:
+        value = getattr(self, name, MISSING)
+        if value is not MISSING:
+            state[name] = value
+    return state
+
+
+def _slots_setstate(self, state):
+    for name, value in state.items():
+        object.__setattr__(self, name, value)
+
+
+def _slotted(cls, extra_slots=()):
+    '''
+    Returns a copy of the dataclass cls which keeps its fields, and the attributes named in extra_slots
+        (e.g. those set by __post_init__), in __slots__ instead of a __dict__, as dataclass(slots=True) does
+        from python 3.10 on. Any other attribute can't be set on its instances.
+    Unless cls defines them, it gets a __getstate__ which returns the attributes as a dict, as for the other
+        yaml classes, and a __setstate__ which sets them from one, so that instances can be pickled.
+    Slots only save memory if every base class of cls has __slots__ too.
+    '''
+    inherited = {name for base in cls.__mro__[1:] for name in vars(base).get('__slots__', ())}
+    # the anchor of a loaded instance is kept for round-trip dumping (see make_constructor).
+    state_names = tuple(dict.fromkeys([field.name for field in fields(cls)] + list(extra_slots) + [Anchor.attrib]))
+    cls_dict = dict(vars(cls))
+    slots = tuple(name for name in state_names if name not in inherited)
+    for name in slots + ('__dict__', '__weakref__'):
+        cls_dict.pop(name, None)
+    cls_dict['__slots__'] = slots
+    cls_dict['__state_slots__'] = state_names
+    if getattr(cls, '__getstate__', None) is getattr(object, '__getstate__', None):
+        cls_dict['__getstate__'] = _slots_getstate
+    if getattr(cls, '__setstate__', None) is None:
+        cls_dict['__setstate__'] = _slots_setstate
+    slotted_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    slotted_cls.__qualname__ = cls.__qualname__
+    # methods using super() refer to the class through their __class__ cell.
+    for value in cls_dict.values():
+        for cell in getattr(getattr(value, '__func__', value), '__closure__', None) or ():
+            try:
+                if cell.cell_contents is cls:
+                    cell.cell_contents = slotted_cls
+            except ValueError:  # an empty cell
+                pass
+    return slotted_cls
+
+
+def yaml_dataclass(cls=None, yaml=yaml_preset, post_init=True, slots=False, **dataclass_kwargs):
+    '''
+    Makes cls a dataclass (unless it already is one), which is loaded from and dumped to yaml with the tag !<class name>.
+    If post_init is not set, __post_init__ is not run for instances loaded from yaml (see make_constructor).
+    If slots is set, instances keep their fields in __slots__ instead of a __dict__, which takes much less memory
+        for configs of many small objects; slots can also be a sequence of the names of other attributes
+        the instances set, e.g. in __post_init__ (see _slotted). This works on any python version.
+    '''
     def wrapper(cls):
         type_hints = get_type_hints(cls)
         if not is_dataclass(cls) or any(name not in cls.__dataclass_fields__ for name in type_hints):
             cls = dataclass(cls, **dataclass_kwargs)
-        yaml.register_class(cls)
-        yaml.constructor.add_constructor(f'!{cls.__name__}', make_constructor(cls))
+        if slots:
+            cls = _slotted(cls, () if slots is True else slots)
+        for yaml_instance in {yaml, yaml_fast}:
+            yaml_instance.register_class(cls)
+            yaml_instance.constructor.add_constructor(f'!{cls.__name__}', make_constructor(cls, post_init))
+        yaml_classes[f'!{cls.__name__}'] = cls
         return cls
 
     return wrapper if cls is None else wrapper(cls)
@@ -162,5 +1127,6 @@ def yaml_dataclass(cls=None, yaml=yaml_preset, **dataclass_kwargs):
 
 
 setup_yaml(yaml_preset,custom_types)
+setup_yaml(yaml_fast,custom_types)
 
 #classes_register = collect_yaml_classes()